@@ -0,0 +1,60 @@
+"""Per-frame paint cost benchmark for the helper window.
+
+Renders the window repeatedly on Qt's offscreen platform, once with the
+cached chrome and once with the chrome redrawn every frame like it used to
+be, both for the window background alone and for a full frame with ten
+downloads in the job list:
+
+    python bench_paint.py [frames]
+"""
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_frames(window, frames, flags, cached):
+    from PySide6.QtCore import QPoint
+    from PySide6.QtGui import QImage, QRegion
+
+    image = QImage(window.size() * window.devicePixelRatioF(), QImage.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(window.devicePixelRatioF())
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not cached:
+            window._chrome_key = None  # Forces a redraw like before the cache
+        image.fill(0)
+        window.render(image, QPoint(), QRegion(), flags)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, SCRIPT_DIR)
+
+    from PySide6.QtWidgets import QApplication, QWidget
+    app = QApplication(sys.argv[:1])
+    import shitty_ytdlphelper
+
+    window = shitty_ytdlphelper.ShittyYTDLPHelper()
+    for i in range(10):
+        window.job_list.addItem(f"[downloading] Some video {i}  {i * 10}% of 123.4 MiB at 2.1 MiB/s, 00:42 left")
+    window.show()
+    app.processEvents()
+
+    background = QWidget.RenderFlag.DrawWindowBackground
+    full = background | QWidget.RenderFlag.DrawChildren
+    print(f"Paint cost per frame over {frames} frames (ms)")
+    print(f"{'frame':<12} {'redrawn':>8} {'cached':>8}")
+    for name, flags in (('chrome', background), ('full', full)):
+        redrawn = time_frames(window, frames, flags, cached=False)
+        cached = time_frames(window, frames, flags, cached=True)
+        print(f"{name:<12} {redrawn:8.3f} {cached:8.3f}")
+    # Don't let the deferred startup work run on the way out
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Time-to-first-paint benchmark for the helper.
+
+Starts the app in fresh processes on Qt's offscreen platform and reports how
+long each startup phase took, so cold start can be tracked between changes:
+
+    python bench_startup.py [runs]
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_child(spawned_at):
+    """Start the app once, report the phase timings and exit at the first paint."""
+    started = time.time()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, SCRIPT_DIR)
+
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QObject, QEvent
+
+    app = QApplication(sys.argv[:1])
+    import shitty_ytdlphelper
+    imported = time.time()
+
+    window = shitty_ytdlphelper.ShittyYTDLPHelper()
+    constructed = time.time()
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if obj is window and event.type() == QEvent.Paint:
+                obj.event(event)  # Let the frame finish before stopping the clock
+                painted = time.time()
+                print(json.dumps({
+                    'interpreter': started - spawned_at,
+                    'import': imported - started,
+                    'construct': constructed - imported,
+                    'first_paint': painted - constructed,
+                    'total': painted - spawned_at,
+                }))
+                sys.stdout.flush()
+                # Skip the deferred startup work, it isn't part of the first frame
+                os._exit(0)
+            return False
+
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+    app.exec()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', repr(time.time())],
+            capture_output=True, text=True, env=env
+        )
+        lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+        if not lines:
+            print(out.stdout + out.stderr)
+            sys.exit("Benchmark run failed")
+        results.append(json.loads(lines[-1]))
+
+    print(f"Startup over {runs} runs (ms)")
+    print(f"{'phase':<12} {'median':>8} {'min':>8} {'max':>8}")
+    for phase in ('interpreter', 'import', 'construct', 'first_paint', 'total'):
+        values = [r[phase] * 1000 for r in results]
+        print(f"{phase:<12} {statistics.median(values):8.1f} {min(values):8.1f} {max(values):8.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        run_child(float(sys.argv[2]))
+    else:
+        main()
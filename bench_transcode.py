@@ -0,0 +1,89 @@
+"""Audio conversion benchmark: one ffmpeg versus the segmented converter.
+
+Generates a long local audio file with ffmpeg (no downloads involved),
+converts it to mp3 once with yt-dlp's stock ExtractAudio and once split
+across the CPU cores (or the given number of processes), and reports the
+time and output length of both:
+
+    python bench_transcode.py [minutes] [processes]
+
+ffmpeg is looked up next to the helper first, then on PATH.
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def media_duration(ffmpeg, path):
+    """Duration in seconds from ffmpeg's own description of the file."""
+    out = subprocess.run([ffmpeg, '-hide_banner', '-i', path], capture_output=True, text=True).stderr
+    match = re.search(r'Duration: (\d+):(\d+):([\d.]+)', out)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def make_source(ffmpeg, path, minutes):
+    """A stereo AAC file of tones over noise, something an encoder has to work at."""
+    subprocess.run([
+        ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=44100:duration={minutes * 60}',
+        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude=0.1:sample_rate=44100:duration={minutes * 60}',
+        '-filter_complex', 'amix=inputs=2,aformat=channel_layouts=stereo',
+        '-c:a', 'aac', '-b:a', '128k', path,
+    ], check=True)
+
+
+def convert(pp, source, work_dir, name):
+    """Run a post-processor on a copy of source, returns (seconds, output path)."""
+    path = os.path.join(work_dir, f'{name}.m4a')
+    shutil.copyfile(source, path)
+    info = {'filepath': path, 'ext': 'm4a', 'duration': media_duration(pp.executable, path)}
+    start = time.perf_counter()
+    _, info = pp.run(info)
+    return time.perf_counter() - start, info['filepath']
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    sys.path.insert(0, SCRIPT_DIR)
+    from ytdlp_engine import find_local_tool
+    ffmpeg = find_local_tool(SCRIPT_DIR, 'ffmpeg') or shutil.which('ffmpeg')
+    if not ffmpeg:
+        sys.exit("ffmpeg not found")
+
+    import yt_dlp
+    from yt_dlp.postprocessor import FFmpegExtractAudioPP
+    from segmented_transcode import SegmentedExtractAudioPP
+
+    ydl = yt_dlp.YoutubeDL({'ffmpeg_location': ffmpeg, 'quiet': True, 'keepvideo': True})
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, 'source.aac.m4a')
+        print(f"Generating {minutes:g} minutes of audio...")
+        make_source(ffmpeg, source, minutes)
+
+        results = []
+        for name, pp in (
+            ('single', FFmpegExtractAudioPP(ydl, preferredcodec='mp3')),
+            ('segmented', SegmentedExtractAudioPP(ydl, workers, preferredcodec='mp3')),
+        ):
+            seconds, output = convert(pp, source, work_dir, name)
+            results.append((name, seconds, media_duration(ffmpeg, output)))
+
+        workers = SegmentedExtractAudioPP(ydl, workers).workers
+        print(f"mp3 conversion of {minutes:g} minutes, {workers} process(es), {os.cpu_count()} core(s)")
+        print(f"{'converter':<12} {'seconds':>8} {'length':>10}")
+        for name, seconds, duration in results:
+            print(f"{name:<12} {seconds:8.2f} {duration or 0:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
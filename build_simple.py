@@ -4,9 +4,19 @@ import shutil
 import sys
 from pathlib import Path
 
+# Assets the app shows scaled down, with their on-screen sizes (logical px)
+PRESCALED_ASSETS = {
+    'update_icon.png': [(40, 40)],
+    'update_icon_gray.png': [(40, 40), (38, 38)],
+    'SYHSB.png': [(200, 197)],
+}
+# Display scalings to pre-scale for, anything else is scaled at runtime
+PRESCALED_RATIOS = (1, 1.25, 1.5, 2)
+PRESCALED_DIR = 'prescaled'
+
 def clean_build():
     """Clean up previous build artifacts."""
-    build_artifacts = ['build', 'dist', 'ShittyYTDLPHelper.spec']
+    build_artifacts = ['build', 'dist', 'ShittyYTDLPHelper.spec', PRESCALED_DIR]
     for item in build_artifacts:
         if os.path.isdir(item):
             print(f"Removing directory: {item}")
@@ -27,6 +37,30 @@ def get_resource_files(rc_dir):
                     resource_files.append((src_path, rel_path))
     return resource_files
 
+def prescale_resources(rc_dir, out_dir):
+    """Write scaled copies of the big assets so the app doesn't scale them at startup.
+
+    The app looks for rc/scaled/<name>@<width>x<height>.png at the exact
+    pixel size it needs and falls back to scaling the original.
+    """
+    from PySide6.QtCore import Qt
+    from PySide6.QtGui import QImage
+    
+    os.makedirs(out_dir, exist_ok=True)
+    for name, sizes in PRESCALED_ASSETS.items():
+        src = os.path.join(rc_dir, name)
+        image = QImage(src)
+        if image.isNull():
+            print(f"Skipping pre-scaling, not found: {src}")
+            continue
+        stem = os.path.splitext(name)[0]
+        for width, height in sizes:
+            for ratio in PRESCALED_RATIOS:
+                w, h = int(width * ratio), int(height * ratio)
+                scaled = image.scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+                scaled.save(os.path.join(out_dir, f'{stem}@{w}x{h}.png'))
+    print(f"Pre-scaled resources written to: {out_dir}")
+
 def build():
     """Build the ShittyYTDLPHelper executable."""
     try:
@@ -45,6 +79,13 @@ def build():
         # Get all resource files
         resource_files = get_resource_files(rc_dir)
         
+        # Pre-scaled assets go to rc/scaled in the bundle
+        prescale_resources(rc_dir, PRESCALED_DIR)
+        resource_files += [
+            (os.path.join(PRESCALED_DIR, f), os.path.join('rc', 'scaled'))
+            for f in os.listdir(PRESCALED_DIR)
+        ]
+        
         # Build PyInstaller arguments
         args = [
             script,
@@ -0,0 +1,151 @@
+"""Split long audio conversions across CPU cores.
+
+One ffmpeg encoding an mp3 keeps about one core busy, so converting a
+three hour podcast takes minutes while the rest of the machine idles. The
+post-processor here cuts the input into time segments, encodes each one
+in its own ffmpeg process at the same time and joins the results with
+ffmpeg's concat demuxer, which copies the encoded audio without touching
+it again.
+
+Every join carries the encoder's start-up delay, a few hundredths of a
+second of near silence, which is why short inputs aren't split at all.
+
+Imports yt_dlp, so only import this when a download is about to happen.
+"""
+import os
+import re
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+from yt_dlp.utils import Popen
+
+# Inputs shorter than this convert in one piece, splitting isn't worth the joins
+MIN_SPLIT_DURATION = 10 * 60
+# Shortest segment worth its own ffmpeg process
+MIN_SEGMENT_DURATION = 2 * 60
+
+DURATION_RE = re.compile(r'Duration: (\d+):(\d+):([\d.]+)')
+
+
+def plan_segments(duration, workers, min_segment=MIN_SEGMENT_DURATION):
+    """Split duration seconds into (start, length) pairs, at most one per worker.
+
+    The last segment has no length and runs to the end of the input, so a
+    duration that is slightly off never loses the tail.
+    """
+    if not duration or duration < MIN_SPLIT_DURATION:
+        return [(0.0, None)]
+    count = max(1, min(workers, int(duration // min_segment)))
+    length = duration / count
+    return [(i * length, length if i < count - 1 else None) for i in range(count)]
+
+
+def probe_duration(pp, path):
+    """Duration of a media file in seconds, None if unknown.
+
+    Asks ffprobe when there is one, else reads ffmpeg's own description
+    of the input, which every ffmpeg build can print.
+    """
+    if pp.probe_available:
+        duration = pp._get_real_video_duration(path, fatal=False)
+        if duration:
+            return duration
+    try:
+        _, stderr, _ = Popen.run(
+            [pp.executable, '-hide_banner', '-i', path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace'
+        )
+    except OSError:
+        return None
+    match = DURATION_RE.search(stderr or '')
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def transcode_segments(pp, path, out_path, segments, opts, workers):
+    """Encode the segments of path in parallel with pp's ffmpeg, then join them into out_path."""
+    ext = os.path.splitext(out_path)[1]
+    # Next to the output so the parts land on the same disk
+    temp_dir = tempfile.mkdtemp(prefix='.segments-', dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        parts = [os.path.join(temp_dir, f'{i:03d}{ext}') for i in range(len(segments))]
+
+        def encode(segment, part):
+            start, length = segment
+            input_opts = ['-ss', f'{start:.3f}']
+            if length is not None:
+                input_opts += ['-t', f'{length:.3f}']
+            pp.real_run_ffmpeg([(path, input_opts)], [(part, opts)])
+
+        # Each thread only waits on its own ffmpeg process
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(encode, segments, parts))
+        pp.concat_files(parts, out_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class SegmentedExtractAudioPP(FFmpegExtractAudioPP):
+    """yt-dlp's ExtractAudio, with long re-encodes split across cores.
+
+    Naming, quality and the keep-the-codec decisions are all the stock
+    post-processor's. Only the ffmpeg run for an actual encode changes.
+    It still reports and takes postprocessor_args as ExtractAudio.
+    """
+
+    def __init__(self, downloader=None, workers=None, **kwargs):
+        super().__init__(downloader, **kwargs)
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self._duration = None
+
+    @classmethod
+    def pp_key(cls):
+        return 'ExtractAudio'
+
+    def run(self, information):
+        self._duration = information.get('duration')
+        # The stock run without its hook wrapper, this class's own wrapper reports it
+        return FFmpegExtractAudioPP.run.__wrapped__(self, information)
+
+    def process_budget(self):
+        """ffmpeg processes to run at once, at most the thread share the job's ffmpeg args allow."""
+        args = self._configuration_args('ffmpeg', ['_o1', '_o', ''])
+        for i, arg in enumerate(args[:-1]):
+            if arg == '-threads' and args[i + 1].isdigit():
+                return max(1, min(self.workers, int(args[i + 1])))
+        return self.workers
+
+    def run_ffmpeg(self, path, out_path, codec, more_opts):
+        if codec in (None, 'copy'):
+            return super().run_ffmpeg(path, out_path, codec, more_opts)
+        workers = self.process_budget()
+        # Direct links and generic pages often come without a duration
+        duration = self._duration or (probe_duration(self, path) if workers > 1 else None)
+        segments = plan_segments(duration, workers)
+        if len(segments) < 2:
+            return super().run_ffmpeg(path, out_path, codec, more_opts)
+        self.to_screen(f'Converting in {len(segments)} segments at once')
+        opts = ['-vn', '-acodec', codec, *more_opts]
+        if codec == 'libmp3lame':
+            # A header frame per part would play as a gap at every join
+            opts += ['-write_xing', '0']
+        transcode_segments(self, path, out_path, segments, opts, workers)
+
+
+def use_segmented_audio(ydl, workers=None):
+    """Swap a YoutubeDL's audio extraction for the segmented one, keeping its settings."""
+    pps = ydl._pps['post_process']
+    for i, pp in enumerate(pps):
+        if type(pp) is FFmpegExtractAudioPP:
+            pps[i] = SegmentedExtractAudioPP(
+                ydl, workers,
+                preferredcodec=pp.mapping,
+                preferredquality=pp._preferredquality,
+                nopostoverwrites=pp._nopostoverwrites,
+            )
@@ -3,17 +3,71 @@ import subprocess
 import platform
 import os
 import webbrowser
-import shutil
 import threading
-import requests
 from pathlib import Path
+
+
+def get_project_dir():
+    """Folder downloads, settings and yt-dlp live in."""
+    # Handle PyInstaller bundled executable
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        # Running as PyInstaller bundle - use executable directory
+        return os.path.dirname(sys.executable)
+    # Running as script - use script directory
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+if __name__ == '__main__':
+    if any(arg == '--batch' or arg.startswith('--batch=') for arg in sys.argv[1:]):
+        # Headless mode is picked before PySide6 is imported, so it never loads
+        from ytdlp_batch import run_batch
+        sys.exit(run_batch(sys.argv[1:], get_project_dir()))
+    
+    # URLs on the command line, e.g. from a browser "open with" handler
+    launch_urls = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    
+    # A second launch hands its URLs to the running helper and quits before
+    # the widget modules are even imported
+    from single_instance import SingleInstance
+    instance = SingleInstance(get_project_dir())
+    if not instance.acquire():
+        if instance.forward(launch_urls):
+            sys.exit(0)
+        instance = None  # Couldn't reach it, run on our own
+
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QDialog,
     QCheckBox, QLineEdit, QPushButton, QMenu, QMessageBox, QHBoxLayout,
-    QSizePolicy
+    QSizePolicy, QListWidget, QListWidgetItem, QFileDialog, QComboBox
 )
-from PySide6.QtCore import Qt, QPoint, QPointF, QTimer, QSize, Signal, QProcess, QRect
-from PySide6.QtGui import QCursor, QMouseEvent, QColor, QPainter, QIcon, QPixmap, QPainterPath
+from PySide6.QtCore import Qt, QPoint, QPointF, QRectF, QTimer, QSize, Signal, QProcess, QRect, QSettings, QEvent
+from PySide6.QtGui import QCursor, QMouseEvent, QColor, QPainter, QIcon, QPixmap, QPainterPath, QImageReader
+from ytdlp_engine import (
+    DownloadQueue, DownloadArchive, QueueJournal, BandwidthBudget, DiskBudget, UpdateChecker, YtdlpUpdater,
+    create_engine, preload_ytdlp, build_ytdlp_args, format_bytes, split_urls, dedup_key,
+    update_cache_path,
+    RUNNING_STATES, FAILED, DOWNLOAD_PROFILES, RELEASES_API_URL, DEFAULT_FREE_SPACE_MARGIN
+)
+
+# Bundled assets, plus build-time pre-scaled copies in rc/scaled
+RC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rc')
+
+
+def read_scaled_image(name, width, height):
+    """Decode an rc asset at a pixel size, safe to call off the GUI thread.
+
+    Uses the copy pre-scaled by build_simple.py when there is one, otherwise
+    decodes the original straight to the target size so the full-size
+    bitmap is never kept around.
+    """
+    stem = os.path.splitext(name)[0]
+    prescaled = os.path.join(RC_DIR, 'scaled', f'{stem}@{width}x{height}.png')
+    if os.path.exists(prescaled):
+        return QImageReader(prescaled).read()
+    reader = QImageReader(os.path.join(RC_DIR, name))
+    reader.setScaledSize(QSize(width, height))
+    return reader.read()
+
 
 class ClickableLabel(QLabel):
     doubleClicked = Signal()
@@ -28,6 +82,22 @@ class ShittyYTDLPHelper(QWidget):
     
     # Signal to update the button from any thread
     update_button_signal = Signal()
+    update_progress_signal = Signal(object, object)  # bytes done, total (or None)
+    update_finished_signal = Signal(str)  # Error message, empty on success
+    image_decoded_signal = Signal(object)  # QImage decoded off the GUI thread
+    ingest_finished_signal = Signal(object)  # (terminal URLs, options, queued, duplicates)
+    engine_picked_signal = Signal(object)  # Engine for the yt-dlp found once its version is known
+    
+    # How often the job list is refreshed, no matter how many downloads run
+    PROGRESS_REFRESH_MS = 100
+    # How many jobs the job list shows (finished ones drop off the top)
+    JOB_LIST_LIMIT = 50
+    # Speed limit choices in MB/s for the right-click menu (0 = unlimited)
+    SPEED_LIMITS = (0, 1, 2, 5, 10, 25, 50)
+    PER_JOB_LIMITS = (0, 0.5, 1, 2, 5)
+    FREE_SPACE_MARGINS = (0, 0.5, 1, 2, 5, 10, 25)  # GB
+    # How much of a dropped text file is read looking for URLs
+    DROP_FILE_LIMIT = 4 * 1024 * 1024
     
     def __init__(self):
         super().__init__()
@@ -36,21 +106,71 @@ class ShittyYTDLPHelper(QWidget):
         self.update_available = False
         self.download_url = None
         self.update_button = None  # Will be set in init_ui
+        self.update_thread = None
+        self.update_dialog = None
+        self.updated_engine = None  # Engine for the yt-dlp an update installed
+        self.update_progress_signal.connect(self.show_update_progress)
+        self.update_finished_signal.connect(self.finish_update)
+        self.engine_picked_signal.connect(self.use_engine)
+        self.image_decoded_signal.connect(self.show_image)
+        self.ingest_finished_signal.connect(self.finish_ingest)
+        self.image_path = None  # Set in init_ui, decoded after the first paint
+        self._pixmap_cache = {}  # (asset, width, height, DPR) -> QPixmap
+        self._pixmap_dpr = None
+        self._watched_screen = None
+        self._chrome = None  # Window background, rendered per size and DPR
+        self._chrome_key = None
+        self._first_paint_done = False
         self.drag_pos = None
         self.snap_threshold = 20
+        self._screen_geometries = []  # Geometry of every screen, primary first
+        self._watched_screens = set()
+        self._pending_drag_pos = None  # Latest drag position not applied yet
         
         # Set project directory and ensure downloads directory exists
-        # Handle PyInstaller bundled executable
-        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-            # Running as PyInstaller bundle - use executable directory
-            self.project_dir = os.path.dirname(sys.executable)
-        else:
-            # Running as script - use script directory
-            self.project_dir = os.path.dirname(os.path.abspath(__file__))
+        self.project_dir = get_project_dir()
         
         self.downloads_dir = os.path.join(self.project_dir, 'downloads')
         os.makedirs(self.downloads_dir, exist_ok=True)
         
+        # Persistent settings live next to the executable like the downloads
+        self.settings = QSettings(os.path.join(self.project_dir, 'settings.ini'), QSettings.IniFormat)
+        
+        # In-process download engine (the external terminal is the fallback)
+        # behind a FIFO queue with a bounded number of concurrent downloads
+        # Total speed limit shared by all running downloads
+        self.bandwidth = BandwidthBudget(
+            self.settings.value('downloads/speed_limit', 0, type=int) or None,
+            self.settings.value('downloads/per_job_limit', 0, type=int) or None
+        )
+        # Downloads wait for disk space instead of filling the disk and failing halfway
+        self.disk_budget = DiskBudget(
+            self.settings.value('downloads/free_space_margin', DEFAULT_FREE_SPACE_MARGIN, type=int)
+        )
+        # Only the cached yt-dlp version decides here, pick_engine() probes once we've painted
+        self.engine = create_engine(self.project_dir, self.downloads_dir, self.bandwidth, self.disk_budget, probe=False)
+        self.download_archive = DownloadArchive(os.path.join(self.project_dir, 'archive.jsonl'))
+        # Submitted downloads are journaled so a crash or quit doesn't lose them
+        self.queue_journal = QueueJournal(os.path.join(self.project_dir, 'queue.journal'))
+        self.download_queue = DownloadQueue(
+            self.engine,
+            max_workers=self.settings.value('downloads/max_workers', 3, type=int),
+            per_host_limit=self.settings.value('downloads/per_host_limit', 2, type=int),
+            archive=self.download_archive,
+            journal=self.queue_journal
+        )
+        self.download_queue.skip_archived = self.settings.value('downloads/skip_archived', True, type=bool)
+        if hasattr(self.engine, 'segment_transcodes'):
+            self.engine.segment_transcodes = self.settings.value('downloads/segment_transcodes', False, type=bool)
+        
+        # Job progress is polled at a fixed rate instead of signalled per
+        # event, so many parallel downloads cost one refresh per tick at most
+        self._shown_revision = -1
+        self._job_items = {}
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(self.PROGRESS_REFRESH_MS)
+        self.progress_timer.timeout.connect(self.refresh_job_list)
+        
         # Set up window properties
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Window)
         self.setAttribute(Qt.WA_TranslucentBackground)
@@ -75,6 +195,12 @@ class ShittyYTDLPHelper(QWidget):
 
         # Initialize UI and start background tasks
         self.init_ui()
+        self.watch_screens()
+        
+        # Drag moves are applied at most once per display frame
+        self.drag_timer = QTimer(self)
+        self.drag_timer.setSingleShot(True)
+        self.drag_timer.timeout.connect(self.apply_pending_drag)
         QTimer.singleShot(100, self.center_on_screen)
         # Start update check after UI is fully initialized (2 second delay)
         QTimer.singleShot(2000, self.start_update_check)
@@ -120,7 +246,38 @@ class ShittyYTDLPHelper(QWidget):
         self.move(frame_geometry.topLeft())
 
     def paintEvent(self, event):
+        if not self._first_paint_done:
+            # Everything that can wait for the first frame starts right after it
+            self._first_paint_done = True
+            QTimer.singleShot(0, self.finish_startup)
+        
+        # The chrome only changes with size and DPR, so it is drawn once and
+        # blitted; child widget updates repaint parts of it all the time
+        device_pixel_ratio = self.devicePixelRatioF()
+        key = (self.width(), self.height(), device_pixel_ratio)
+        if self._chrome_key != key:
+            self._chrome = self.render_chrome(device_pixel_ratio)
+            self._chrome_key = key
+        
+        rect = event.rect()
         painter = QPainter(self)
+        painter.drawPixmap(
+            QRectF(rect),
+            self._chrome,
+            QRectF(
+                rect.x() * device_pixel_ratio, rect.y() * device_pixel_ratio,
+                rect.width() * device_pixel_ratio, rect.height() * device_pixel_ratio
+            )
+        )
+        painter.end()
+    
+    def render_chrome(self, device_pixel_ratio):
+        """Draw the border and translucent background into a pixmap."""
+        chrome = QPixmap(self.size() * device_pixel_ratio)
+        chrome.setDevicePixelRatio(device_pixel_ratio)
+        chrome.fill(Qt.GlobalColor.transparent)
+        
+        painter = QPainter(chrome)
         painter.setRenderHint(QPainter.Antialiasing)
         
         # Draw the white 3px border first
@@ -134,6 +291,8 @@ class ShittyYTDLPHelper(QWidget):
         painter.setBrush(bg_color)
         painter.setPen(Qt.NoPen)
         painter.drawRoundedRect(self.rect().adjusted(3, 3, -3, -3), 17, 17)
+        painter.end()
+        return chrome
 
     def init_ui(self):
         base_color = QColor("#2a2a2a")
@@ -191,6 +350,24 @@ class ShittyYTDLPHelper(QWidget):
             QCheckBox::indicator:checked {{
                 background-color: white;
             }}
+            QListWidget#jobList {{
+                background-color: {darker_color.name()};
+                border: 1px solid white;
+                border-radius: 10px;
+                padding: 4px;
+                font-size: 12px;
+            }}
+            QComboBox {{
+                background-color: #333;
+                border: 1px solid white;
+                border-radius: 8px;
+                padding: 2px 8px;
+                font-size: 14px;
+            }}
+            QComboBox QAbstractItemView {{
+                background-color: {base_color.name()};
+                selection-background-color: {darker_color.name()};
+            }}
             QLineEdit {{
                 background-color: #333;
                 border: 2px solid white;
@@ -254,8 +431,12 @@ class ShittyYTDLPHelper(QWidget):
         self.urllabel.setObjectName("urllabel")
         main_layout.addWidget(self.urllabel)
 
+        # Takes one URL or a pasted dump of them, text files can be dropped on it
         self.url_input = QLineEdit()
+        self.url_input.setPlaceholderText("One or many URLs, or drop a text file")
+        self.url_input.installEventFilter(self)
         main_layout.addWidget(self.url_input)
+        self.setAcceptDrops(True)
 
         # Create a horizontal layout for checkboxes and image
         content_layout = QHBoxLayout()
@@ -276,7 +457,25 @@ class ShittyYTDLPHelper(QWidget):
         self.embed_subs = QCheckBox("Embed Subtitles")
         self.ffmpeg_check = QCheckBox("Use FFmpeg (if available)")
         self.ffmpeg_check.setChecked(True)  # Keep FFmpeg ON by default
+        self.fast_path = QCheckBox("Fast Path (No Re-encoding)")
+        self.fast_path.setToolTip(
+            "Prefer streams that only need remuxing and keep audio in its original codec (Audio Only gives no mp3)"
+        )
         
+        # Transfer profile: parallel fragments, chunk and buffer sizes
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItem("Speed: Auto (per site)", "Auto")
+        for name in DOWNLOAD_PROFILES:
+            self.profile_combo.addItem(f"Speed: {name}", name)
+        self.profile_combo.setToolTip("Download profile: how many fragments to fetch at once and how big the chunks are")
+        saved_profile = self.profile_combo.findData(self.settings.value('downloads/profile', 'Auto'))
+        self.profile_combo.setCurrentIndex(max(0, saved_profile))
+        self.profile_combo.currentIndexChanged.connect(
+            lambda: self.settings.setValue('downloads/profile', self.profile_combo.currentData())
+        )
+        
+        self.use_terminal = QCheckBox("Use External Terminal")
+        self.use_terminal.setToolTip("Run yt-dlp in a terminal window instead of inside the helper")
         self.auto_close_terminal = QCheckBox("Auto-Close Terminal")
         self.auto_close_terminal.setChecked(True)
 
@@ -286,6 +485,9 @@ class ShittyYTDLPHelper(QWidget):
         checkboxes_layout.addWidget(self.audio_only)
         checkboxes_layout.addWidget(self.embed_subs)
         checkboxes_layout.addWidget(self.ffmpeg_check)
+        checkboxes_layout.addWidget(self.fast_path)
+        checkboxes_layout.addWidget(self.profile_combo)
+        checkboxes_layout.addWidget(self.use_terminal)
         checkboxes_layout.addWidget(self.auto_close_terminal)
         checkboxes_layout.addStretch()
         
@@ -298,25 +500,25 @@ class ShittyYTDLPHelper(QWidget):
         
         # Ensure downloads directory exists (already set in __init__)
         
-        # Load and set up the image with error handling
+        # Size the image from its header only, decoding waits until the window is up
         try:
-            image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rc', 'SYHSB.png')
-            pixmap = QPixmap(image_path)
+            image_path = os.path.join(RC_DIR, 'SYHSB.png')
+            image_size = QImageReader(image_path).size()
             
-            if pixmap.isNull():
+            if not image_size.isValid():
                 raise ValueError(f"Failed to load image: {image_path}")
             
             # Calculate size to fit the space
-            checkbox_height = (7 * 24) + (6 * 8)  # 7 checkboxes * 24px height + 6 gaps * 8px
+            checkbox_height = (10 * 24) + (9 * 8)  # 9 checkboxes + profile box * 24px height + 9 gaps * 8px
             max_width = 200
             min_size = 32  # Minimum size to prevent division by zero
             
             # Ensure we have valid dimensions
-            if pixmap.width() <= 0 or pixmap.height() <= 0:
-                raise ValueError(f"Invalid image dimensions: {pixmap.width()}x{pixmap.height()}")
+            if image_size.width() <= 0 or image_size.height() <= 0:
+                raise ValueError(f"Invalid image dimensions: {image_size.width()}x{image_size.height()}")
             
             # Calculate aspect ratio safely
-            aspect_ratio = max(0.1, pixmap.width() / max(pixmap.height(), 1))
+            aspect_ratio = max(0.1, image_size.width() / max(image_size.height(), 1))
             height = max(min_size, checkbox_height)
             width = max(min_size, int(height * aspect_ratio))
             
@@ -324,20 +526,10 @@ class ShittyYTDLPHelper(QWidget):
                 width = max(max_width, min_size)
                 height = max(min_size, int(width / max(aspect_ratio, 0.1)))
             
-            # Scale using device pixel ratio for better quality
-            device_pixel_ratio = max(1.0, self.devicePixelRatio())
-            scaled_pixmap = pixmap.scaled(
-                max(1, int(width * device_pixel_ratio)),
-                max(1, int(height * device_pixel_ratio)),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            
-            if not scaled_pixmap.isNull():
-                scaled_pixmap.setDevicePixelRatio(device_pixel_ratio)
-                self.image_label.setPixmap(scaled_pixmap)
-                self.image_label.setAlignment(Qt.AlignRight | Qt.AlignTop)
-                self.image_label.setFixedSize(max(1, width), max(1, height))
+            # Reserve the space now so the layout doesn't jump when the image arrives
+            self.image_label.setAlignment(Qt.AlignRight | Qt.AlignTop)
+            self.image_label.setFixedSize(max(1, width), max(1, height))
+            self.image_path = image_path
             
         except Exception as e:
             print(f"Error loading image: {e}")
@@ -359,6 +551,14 @@ class ShittyYTDLPHelper(QWidget):
         # Add upper container to main layout with stretch to push it to the top
         main_layout.addWidget(upper_container, 1)  # Takes all available space
         
+        # Live status of queued and running downloads
+        self.job_list = QListWidget()
+        self.job_list.setObjectName("jobList")
+        self.job_list.setFixedHeight(130)
+        self.job_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.job_list.setTextElideMode(Qt.ElideMiddle)
+        main_layout.addWidget(self.job_list)
+        
         # Create button container with fixed height
         button_container = QWidget()
         button_container.setFixedHeight(45)
@@ -380,14 +580,10 @@ class ShittyYTDLPHelper(QWidget):
         
         # Set initial icon and size
         self.update_button.setFixedSize(40, 40)
-        icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rc", "update_icon_gray.png")
+        icon_path = os.path.join(RC_DIR, "update_icon_gray.png")
         if os.path.exists(icon_path):
-            # Load and scale the icon to fill the button
-            pixmap = QPixmap(icon_path).scaled(
-                38, 38,  # Slightly smaller than button to account for border
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
+            # Slightly smaller than button to account for border
+            pixmap = self.cached_pixmap("update_icon_gray.png", 38, 38)
             
             # Create a new pixmap with transparent background
             result = QPixmap(40, 40)
@@ -420,101 +616,432 @@ class ShittyYTDLPHelper(QWidget):
         # Set focus to URL input box for better UX after window is shown
         QTimer.singleShot(100, lambda: self.url_input.setFocus())
 
+    def get_download_options(self):
+        """Collect the checkbox state into an options dict for the engine."""
+        return {
+            'best_quality': self.best_quality.isChecked(),
+            'mp4_output': self.mp4_output.isChecked(),
+            'pretty_naming': self.pretty_naming.isChecked(),
+            'audio_only': self.audio_only.isChecked(),
+            'embed_subs': self.embed_subs.isChecked(),
+            'use_ffmpeg': self.ffmpeg_check.isChecked(),
+            'fast_path': self.fast_path.isChecked(),
+            'profile': self.profile_combo.currentData(),
+        }
+
     def download(self):
         """Handle the download button click event."""
-        url = self.url_input.text().strip()
-        if not url:
+        text = self.url_input.text().strip()
+        if not text:
             self.show_custom_message("Error", "Please enter a video URL.")
             return
+        # One URL or a whole pasted dump; anything without http(s) goes to yt-dlp as typed
+        urls = split_urls(text) or [text]
 
-        args = []
+        options = self.get_download_options()
         
-        # Handle the quality/format selection
-        if self.audio_only.isChecked() and self.best_quality.isChecked():
+        if options['audio_only'] and options['best_quality']:
             # If both are checked, default to audio-only (more specific use case)
             self.show_custom_message(
                 "Info",
                 "Both 'Best Quality' and 'Audio Only' were selected.\n"
                 "Defaulting to 'Audio Only' for best results."
             )
-            args.extend(["-x", "--audio-format", "mp3"])
-        elif self.audio_only.isChecked():
-            args.extend(["-x", "--audio-format", "mp3"])
-        elif self.best_quality.isChecked():
-            args.extend(["-f", "bestvideo+bestaudio"])
-        
-        if self.mp4_output.isChecked() and not self.audio_only.isChecked():
-            args.extend(["--merge-output-format", "mp4"])
-        
-        # Set output template
-        if self.pretty_naming.isChecked():
-            output_template = os.path.join(self.downloads_dir, '%(title)s.%(ext)s')
-        else:
-            output_template = os.path.join(self.downloads_dir, '%(title)s-%(id)s.%(ext)s')
-            
-        args.extend(['-o', output_template])
-        
-        if self.embed_subs.isChecked():
-            args.append("--embed-subs")
-        
-        # Add the URL at the end
-        args.append(url)
         
-        # Build the command
-        cmd = ["yt-dlp"] + args
-        
-        # Run the command in a new terminal window
-        try:
-            if platform.system() == "Windows":
-                if self.auto_close_terminal.isChecked():
-                    # On Windows with auto-close, run directly in a new console
-                    subprocess.Popen(
-                        cmd,
-                        creationflags=subprocess.CREATE_NEW_CONSOLE,
-                        cwd=self.project_dir
-                    )
+        self.ingest_urls(urls, options)
+        self.url_input.clear()
+
+    def ingest_urls(self, urls, options=None):
+        """Start downloads for a batch of URLs, the same video only ever once.
+
+        Repeats within the batch and URLs of videos that are already queued
+        or running are dropped. Canonicalizing may have to load yt-dlp's
+        extractors, so it runs on a worker thread.
+        """
+        options = options or self.get_download_options()
+        threading.Thread(
+            target=self.canonicalize_urls,
+            args=(urls, options, self.use_terminal.isChecked()),
+            daemon=True
+        ).start()
+
+    def canonicalize_urls(self, urls, options, terminal):
+        """Deduplicate and queue URLs, runs on a worker thread."""
+        to_launch = []
+        queued = duplicates = 0
+        seen = set()
+        for url in urls:
+            try:
+                if terminal:
+                    # Terminals are started on the GUI thread, only dedupe here
+                    key = dedup_key(url)
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    to_launch.append(url)
                 else:
-                    # On Windows without auto-close, use cmd /k to keep terminal open
-                    subprocess.Popen(
-                        ["cmd", "/k"] + cmd,
-                        creationflags=subprocess.CREATE_NEW_CONSOLE,
-                        cwd=self.project_dir
-                    )
+                    job, is_new = self.download_queue.submit_unique(url, options)
+                    if is_new:
+                        queued += 1
+                    else:
+                        duplicates += 1
+            except Exception as e:
+                print(f"Could not queue {url}: {e}")
+        self.ingest_finished_signal.emit((to_launch, options, queued, duplicates))
+
+    def finish_ingest(self, result):
+        """Start terminals and the progress display for an ingested batch."""
+        to_launch, options, queued, duplicates = result
+        for url in to_launch:
+            try:
+                self.launch_in_terminal(url, options)
+            except Exception as e:
+                self.show_custom_message("Error", f"Could not start download:\n{e}")
+                break
+        if queued and not self.progress_timer.isActive():
+            self.progress_timer.start()
+        if duplicates:
+            print(f"Skipped {duplicates} duplicate URL(s)")
+            self.show_custom_message(
+                "Info",
+                f"Started {queued + len(to_launch)} download(s).\n"
+                f"Skipped {duplicates} duplicate URL(s) that were already in the list or downloading."
+            )
+
+    def receive_urls(self, urls):
+        """URLs handed over by another launch, or from the command line."""
+        if urls:
+            self.ingest_urls(urls)
+        # Show we got them, a launch without URLs just wants the window
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def finish_startup(self):
+        """Startup work that runs once the window has painted."""
+        self.watch_screen_changes()
+        self.load_logo()
+        # Importing yt-dlp takes a while, get it done before the first download needs it
+        threading.Thread(target=preload_ytdlp, daemon=True).start()
+        threading.Thread(target=self.pick_engine, daemon=True).start()
+        # Pick up whatever the last session left unfinished
+        self.resume_unfinished_downloads()
+    
+    def pick_engine(self):
+        """Choose the engine again with the yt-dlp executable's version probed, runs on a worker thread."""
+        try:
+            engine = create_engine(self.project_dir, self.downloads_dir, self.bandwidth, self.disk_budget)
+        except Exception as e:
+            print(f"Could not check the yt-dlp executable: {e}")
+            return
+        if type(engine) is not type(self.engine):
+            self.engine_picked_signal.emit(engine)
+
+    def use_engine(self, engine):
+        """Run downloads starting from now on with engine, running ones finish on the old one."""
+        self.engine = engine
+        self.download_queue.engine = engine
+        if hasattr(engine, 'segment_transcodes'):
+            engine.segment_transcodes = self.settings.value('downloads/segment_transcodes', False, type=bool)
+        if self.latest_version is not None:
+            # The update button compared against the other yt-dlp, the answers are cached
+            self.start_update_check()
+
+    def load_logo(self):
+        """Decode the logo for the current DPR on a worker thread."""
+        if not self.image_path:
+            return
+        device_pixel_ratio = max(1.0, self.devicePixelRatio())
+        size = self.image_label.size()
+        key = (os.path.basename(self.image_path), size.width(), size.height(), device_pixel_ratio)
+        if key in self._pixmap_cache:
+            self.image_label.setPixmap(self._pixmap_cache[key])
+            return
+        threading.Thread(target=self.decode_image, args=(key,), daemon=True).start()
+    
+    def decode_image(self, key):
+        """Decode the image at its display size, runs on a worker thread."""
+        name, width, height, device_pixel_ratio = key
+        image = read_scaled_image(name, int(width * device_pixel_ratio), int(height * device_pixel_ratio))
+        if image.isNull():
+            print(f"Error loading image: {name}")
+            return
+        image.setDevicePixelRatio(device_pixel_ratio)
+        # QPixmaps may only be made on the GUI thread
+        self.image_decoded_signal.emit((key, image))
+    
+    def show_image(self, decoded):
+        """Put the decoded image into its label."""
+        key, image = decoded
+        pixmap = QPixmap.fromImage(image)
+        self._pixmap_cache[key] = pixmap
+        if key[3] == max(1.0, self.devicePixelRatio()):  # Not overtaken by a DPR change
+            self.image_label.setPixmap(pixmap)
+    
+    def cached_pixmap(self, name, width, height):
+        """An rc asset scaled to width x height at the current DPR.
+
+        Each asset is decoded and scaled once per size and DPR; the cache is
+        dropped when the window lands on a screen with another DPR.
+        """
+        device_pixel_ratio = max(1.0, self.devicePixelRatio())
+        key = (name, width, height, device_pixel_ratio)
+        pixmap = self._pixmap_cache.get(key)
+        if pixmap is None:
+            image = read_scaled_image(name, int(width * device_pixel_ratio), int(height * device_pixel_ratio))
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(device_pixel_ratio)
+            self._pixmap_cache[key] = pixmap
+        return pixmap
+    
+    def watch_screen_changes(self):
+        """Reload scaled assets when the DPR under the window changes."""
+        handle = self.windowHandle()
+        if handle:
+            handle.screenChanged.connect(self.on_screen_changed)
+        self.on_screen_changed(self.screen())
+    
+    def on_screen_changed(self, screen):
+        """Drop pixmaps made for the old DPR and redraw the ones in use."""
+        if self._watched_screen is not screen:
+            if self._watched_screen:
+                self._watched_screen.logicalDotsPerInchChanged.disconnect(self.on_screen_dpi_changed)
+            self._watched_screen = screen
+            if screen:
+                # Display scaling can change without the screen changing
+                screen.logicalDotsPerInchChanged.connect(self.on_screen_dpi_changed)
+        device_pixel_ratio = max(1.0, self.devicePixelRatio())
+        if device_pixel_ratio == self._pixmap_dpr:
+            return
+        first = self._pixmap_dpr is None
+        self._pixmap_dpr = device_pixel_ratio
+        if first:
+            return
+        self._pixmap_cache.clear()
+        self.style_update_button()
+        self.load_logo()
+    
+    def on_screen_dpi_changed(self, dpi):
+        self.on_screen_changed(self.screen())
+    
+    def resume_unfinished_downloads(self):
+        """Requeue downloads the previous session didn't finish.
+
+        Partial files are continued by yt-dlp and finished playlist entries
+        are skipped through the archive, so nothing is fetched twice.
+        """
+        resumed = self.download_queue.resume_journaled()
+        if resumed:
+            print(f"Resuming {len(resumed)} unfinished download(s)")
+            self.progress_timer.start()
+
+    def refresh_job_list(self):
+        """Redraw the job list if any job changed since the last tick."""
+        revision = self.download_queue.revision
+        if revision == self._shown_revision:
+            if not self.download_queue.active_jobs():
+                # Nothing running and nothing new, stop ticking until the next download
+                self.progress_timer.stop()
+            return
+        self._shown_revision = revision
+        
+        jobs = self.visible_jobs()
+        shown_ids = {job.id for job in jobs}
+        
+        # Drop rows of jobs that scrolled out of the list
+        for job_id in list(self._job_items):
+            if job_id not in shown_ids:
+                item = self._job_items.pop(job_id)
+                self.job_list.takeItem(self.job_list.row(item))
+        
+        for row, job in enumerate(jobs):
+            text = job.status_text()
+            if job.parent is not None:
+                text = "    " + text  # Indent playlist entries under their group
+            item = self._job_items.get(job.id)
+            if item is None:
+                item = QListWidgetItem(text)
+                item.setToolTip(job.url)
+                self.job_list.insertItem(row, item)
+                self._job_items[job.id] = item
             else:
-                # For Linux/macOS
-                if self.auto_close_terminal.isChecked():
-                    # Close terminal automatically after completion
-                    terminal_cmd = " ".join(cmd)
-                else:
-                    # Keep terminal open and wait for key press
-                    terminal_cmd = " ".join(cmd) + "; echo 'Press any key to close...'; read -n1"
-                
-                # Try different terminal emulators
-                terminals = ["x-terminal-emulator", "gnome-terminal", "konsole", "xterm"]
-                terminal_found = False
-                
-                for term in terminals:
-                    try:
-                        subprocess.Popen(
-                            [term, "-e", "bash", "-c", terminal_cmd],
-                            cwd=self.project_dir  # Run from project dir so yt-dlp and ffmpeg are found
-                        )
-                        terminal_found = True
-                        break
-                    except FileNotFoundError:
-                        continue
-                
-                if not terminal_found:
-                    raise Exception("No terminal emulator found. Please install x-terminal-emulator, gnome-terminal, konsole, or xterm.")
+                if self.job_list.row(item) != row:
+                    self.job_list.takeItem(self.job_list.row(item))
+                    self.job_list.insertItem(row, item)
+                if item.text() != text:
+                    item.setText(text)
+
+    def visible_jobs(self):
+        """Jobs to show, playlists as one group row plus their busy entries."""
+        top_level = [job for job in self.download_queue.jobs if job.parent is None]
+        rows = []
+        for job in top_level[-self.JOB_LIST_LIMIT:]:
+            rows.append(job)
+            rows.extend(
+                child for child in job.children
+                if child.state in RUNNING_STATES or child.state == FAILED
+            )
+        return rows
+
+    def set_max_workers(self, count):
+        """Change how many downloads run at the same time."""
+        self.download_queue.set_max_workers(count)
+        self.settings.setValue('downloads/max_workers', count)
+
+    def set_per_host_limit(self, count):
+        """Change how many downloads may run against one site, 0 for no limit."""
+        self.download_queue.set_per_host_limit(count)
+        self.settings.setValue('downloads/per_host_limit', count)
+
+    def set_speed_limit(self, total_limit, per_job_limit):
+        """Change the speed limits (bytes per second, 0 for unlimited)."""
+        self.bandwidth.set_limits(total_limit or None, per_job_limit or None)
+        self.settings.setValue('downloads/speed_limit', int(total_limit or 0))
+        self.settings.setValue('downloads/per_job_limit', int(per_job_limit or 0))
+
+    def set_free_space_margin(self, margin):
+        """Change how much disk space downloads leave free (bytes)."""
+        self.disk_budget.set_margin(margin)
+        self.settings.setValue('downloads/free_space_margin', margin)
+
+    def set_skip_archived(self, enabled):
+        """Toggle skipping videos that are already in the download archive."""
+        self.download_queue.skip_archived = enabled
+        self.settings.setValue('downloads/skip_archived', enabled)
+
+    def set_segment_transcodes(self, enabled):
+        """Toggle converting long audio in parallel segments."""
+        self.engine.segment_transcodes = enabled
+        self.settings.setValue('downloads/segment_transcodes', enabled)
+
+    def import_archive(self):
+        """Merge a yt-dlp --download-archive file into the download archive."""
+        path, _ = QFileDialog.getOpenFileName(self, "Import yt-dlp Archive", self.project_dir, "Text files (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            added = self.download_archive.import_ytdlp(path)
+            self.show_custom_message("Archive Imported", f"Added {added} videos to the download archive.")
+        except Exception as e:
+            self.show_custom_message("Error", f"Could not import archive:\n{e}", is_error=True)
+
+    def export_archive(self):
+        """Write the download archive as a yt-dlp --download-archive file."""
+        path, _ = QFileDialog.getSaveFileName(self, "Export yt-dlp Archive", os.path.join(self.project_dir, 'archive.txt'), "Text files (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            count = self.download_archive.export_ytdlp(path)
+            self.show_custom_message("Archive Exported", f"Wrote {count} videos to:\n{path}")
+        except Exception as e:
+            self.show_custom_message("Error", f"Could not export archive:\n{e}", is_error=True)
+
+    def launch_in_terminal(self, url, options):
+        """Fallback: run the yt-dlp executable in a new terminal window."""
+        cmd = ["yt-dlp"] + build_ytdlp_args(url, options, self.downloads_dir)
+        
+        if platform.system() == "Windows":
+            if self.auto_close_terminal.isChecked():
+                # On Windows with auto-close, run directly in a new console
+                subprocess.Popen(
+                    cmd,
+                    creationflags=subprocess.CREATE_NEW_CONSOLE,
+                    cwd=self.project_dir
+                )
+            else:
+                # On Windows without auto-close, use cmd /k to keep terminal open
+                subprocess.Popen(
+                    ["cmd", "/k"] + cmd,
+                    creationflags=subprocess.CREATE_NEW_CONSOLE,
+                    cwd=self.project_dir
+                )
+        else:
+            # For Linux/macOS
+            if self.auto_close_terminal.isChecked():
+                # Close terminal automatically after completion
+                terminal_cmd = " ".join(cmd)
+            else:
+                # Keep terminal open and wait for key press
+                terminal_cmd = " ".join(cmd) + "; echo 'Press any key to close...'; read -n1"
             
-            # Clear the URL input after successful download start
-            self.url_input.clear()
+            # Try different terminal emulators
+            terminals = ["x-terminal-emulator", "gnome-terminal", "konsole", "xterm"]
+            terminal_found = False
             
-        except Exception as e:
-            self.show_custom_message("Error", f"Could not start download:\n{e}")
+            for term in terminals:
+                try:
+                    subprocess.Popen(
+                        [term, "-e", "bash", "-c", terminal_cmd],
+                        cwd=self.project_dir  # Run from project dir so yt-dlp and ffmpeg are found
+                    )
+                    terminal_found = True
+                    break
+                except FileNotFoundError:
+                    continue
+            
+            if not terminal_found:
+                raise Exception("No terminal emulator found. Please install x-terminal-emulator, gnome-terminal, konsole, or xterm.")
     
     def contextMenuEvent(self, event):
         menu = QMenu(self)
+        
+        workers_menu = menu.addMenu("Parallel Downloads")
+        for count in (1, 2, 3, 4, 6, 8):
+            action = workers_menu.addAction(str(count))
+            action.setCheckable(True)
+            action.setChecked(count == self.download_queue.max_workers)
+            action.triggered.connect(lambda checked=False, c=count: self.set_max_workers(c))
+        
+        # Too many at once against one site gets us rate limited
+        host_menu = menu.addMenu("Parallel Downloads Per Site")
+        for count in (1, 2, 3, 4, 0):
+            action = host_menu.addAction(str(count) if count else "Unlimited")
+            action.setCheckable(True)
+            action.setChecked(count == self.download_queue.per_host_limit)
+            action.triggered.connect(lambda checked=False, c=count: self.set_per_host_limit(c))
+        
+        # Speed limits, the total one is shared out between running downloads
+        for title, choices, is_total in (
+            ("Speed Limit (Total)", self.SPEED_LIMITS, True),
+            ("Speed Limit (Per Download)", self.PER_JOB_LIMITS, False),
+        ):
+            limit_menu = menu.addMenu(title)
+            current = (self.bandwidth.global_limit if is_total else self.bandwidth.per_job_limit) or 0
+            for mb in choices:
+                limit = int(mb * 1024 * 1024)
+                action = limit_menu.addAction(f"{mb:g} MB/s" if mb else "Unlimited")
+                action.setCheckable(True)
+                action.setChecked(limit == current)
+                if is_total:
+                    action.triggered.connect(lambda checked=False, l=limit: self.set_speed_limit(l, self.bandwidth.per_job_limit))
+                else:
+                    action.triggered.connect(lambda checked=False, l=limit: self.set_speed_limit(self.bandwidth.global_limit, l))
+        
+        margin_menu = menu.addMenu("Keep Free Disk Space")
+        for gb in self.FREE_SPACE_MARGINS:
+            margin = int(gb * 1024 ** 3)
+            action = margin_menu.addAction(f"{gb:g} GB" if gb else "Nothing")
+            action.setCheckable(True)
+            action.setChecked(margin == self.disk_budget.margin)
+            action.triggered.connect(lambda checked=False, m=margin: self.set_free_space_margin(m))
+        
+        skip_action = menu.addAction("Skip Already Downloaded")
+        skip_action.setCheckable(True)
+        skip_action.setChecked(self.download_queue.skip_archived)
+        skip_action.triggered.connect(self.set_skip_archived)
+        if hasattr(self.engine, 'segment_transcodes'):
+            # Only the in-process engine can swap yt-dlp's post-processors
+            segment_action = menu.addAction("Split Long Conversions Across Cores")
+            segment_action.setCheckable(True)
+            segment_action.setChecked(self.engine.segment_transcodes)
+            segment_action.triggered.connect(self.set_segment_transcodes)
+        archive_menu = menu.addMenu("Download Archive")
+        archive_menu.addAction("Import yt-dlp Archive...").triggered.connect(self.import_archive)
+        archive_menu.addAction("Export yt-dlp Archive...").triggered.connect(self.export_archive)
+        
+        menu.addSeparator()
         quit_action = menu.addAction("Exit")
         quit_action.triggered.connect(self.quit_application)
         menu.exec(QCursor.pos())
@@ -526,20 +1053,58 @@ class ShittyYTDLPHelper(QWidget):
 
     def mouseMoveEvent(self, event: QMouseEvent):
         if self.drag_pos is not None:
-            new_pos = event.globalPosition().toPoint() - self.drag_pos
-            snapped_pos = self.apply_snapping(new_pos)
-            self.move(snapped_pos)
+            self._pending_drag_pos = event.globalPosition().toPoint() - self.drag_pos
+            # Mice report far more often than the display refreshes, the first
+            # move goes through and the rest are coalesced until the next frame
+            if not self.drag_timer.isActive():
+                self.apply_pending_drag()
+                self.drag_timer.start(self._drag_interval)
             
     def mouseReleaseEvent(self, event: QMouseEvent):
+        self.drag_timer.stop()
+        self.apply_pending_drag()
         self.drag_pos = None
         self.unsetCursor()
 
+    def apply_pending_drag(self):
+        """Move the window to the latest drag position, if it changed."""
+        if self._pending_drag_pos is None:
+            return
+        snapped_pos = self.apply_snapping(self._pending_drag_pos)
+        self._pending_drag_pos = None
+        self.move(snapped_pos)
+
+    def watch_screens(self):
+        """Keep the screen geometry cache in sync with the connected screens."""
+        app = QApplication.instance()
+        app.screenAdded.connect(self.refresh_screen_cache)
+        app.screenRemoved.connect(self.refresh_screen_cache)
+        app.primaryScreenChanged.connect(self.refresh_screen_cache)
+        self.refresh_screen_cache()
+
+    def refresh_screen_cache(self, *args):
+        """Re-read screen geometries and the fastest refresh rate."""
+        screens = QApplication.screens()
+        primary = QApplication.primaryScreen()
+        for screen in screens:
+            if screen not in self._watched_screens:
+                self._watched_screens.add(screen)
+                screen.geometryChanged.connect(self.refresh_screen_cache)
+                screen.refreshRateChanged.connect(self.refresh_screen_cache)
+        self._watched_screens.intersection_update(screens)
+        
+        self._screen_geometries = [
+            screen.geometry() for screen in sorted(screens, key=lambda screen: screen is not primary)
+        ]
+        refresh_rate = max((screen.refreshRate() for screen in screens), default=60) or 60
+        self._drag_interval = max(1, int(1000 / refresh_rate))
+
     def apply_snapping(self, pos):
-        # Get the screen that contains the current window
-        screen = QApplication.screenAt(pos)
-        if not screen:
-            screen = QApplication.primaryScreen()
-        screen_geo = screen.geometry()
+        # Get the screen that contains the current window, from the cache
+        screen_geo = next(
+            (geo for geo in self._screen_geometries if geo.contains(pos)),
+            self._screen_geometries[0] if self._screen_geometries else QRect()
+        )
         
         window_rect = self.geometry()
         window_rect.moveTo(pos)
@@ -589,35 +1154,22 @@ class ShittyYTDLPHelper(QWidget):
         """Check for yt-dlp updates in a background thread"""
         try:
             print("Checking for yt-dlp updates...")
-            api = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
-            r = requests.get(api, timeout=5)
-            if not r.ok:
-                print(f"Failed to check for updates: HTTP {r.status_code}")
+            # Compare against the yt-dlp downloads actually run with, bundled or executable
+            checker = UpdateChecker(
+                update_cache_path(self.project_dir),
+                self.engine.ytdlp_path(),
+                # Overridable so the check can be pointed at a stand-in server
+                api_url=self.settings.value('update/api_url', RELEASES_API_URL)
+            )
+            latest_version, download_url, local_ver, update_available = checker.check()
+            if latest_version is None:
                 return
-                
-            data = r.json()
-            self.latest_version = data.get("tag_name")
-            print(f"Latest version on GitHub: {self.latest_version}")
             
-            for asset in data.get("assets", []):
-                if asset.get("name") == "yt-dlp.exe":
-                    self.download_url = asset.get("browser_download_url")
-                    break
-                    
-            local_ver = None
-            try:
-                cmd = ["yt-dlp.exe" if platform.system()=="Windows" else "yt-dlp", "--version"]
-                run_args = {"capture_output": True, "text": True}
-                if platform.system() == "Windows":
-                    run_args["creationflags"] = subprocess.CREATE_NO_WINDOW
-                out = subprocess.run(cmd, **run_args)
-                if out.returncode == 0:
-                    local_ver = out.stdout.strip()
-                    print(f"Local yt-dlp version: {local_ver}")
-            except Exception as e:
-                print(f"Failed to get local yt-dlp version: {e}")
-                
-            self.update_available = (local_ver is None or local_ver != self.latest_version)
+            self.latest_version = latest_version
+            self.download_url = download_url
+            print(f"Latest version on GitHub: {self.latest_version}")
+            print(f"Local yt-dlp version: {local_ver}")
+            self.update_available = update_available
             print(f"Update available: {self.update_available}")
             
             # Use signal to update the UI from the main thread
@@ -637,39 +1189,27 @@ class ShittyYTDLPHelper(QWidget):
                 
             # Both icons are 1024x1024 and should be treated identically
             icon_file = "update_icon.png" if self.update_available else "update_icon_gray.png"
-            icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rc", icon_file)
+            icon_path = os.path.join(RC_DIR, icon_file)
             
             if not os.path.exists(icon_path):
                 print(f"Icon not found: {icon_path}")
                 return
             
-            # Get the device pixel ratio for high-DPI displays
-            screen = self.screen()
-            pixel_ratio = screen.devicePixelRatio() if screen else 1.0
-            
             # Button size (40x40)
             button_size = QSize(40, 40)
             
+            # Scaled to fill the entire button, decoded once per size and DPR
+            scaled_pixmap = self.cached_pixmap(icon_file, button_size.width(), button_size.height())
+            if scaled_pixmap.isNull():
+                print(f"Failed to load icon: {icon_path}")
+                return
+            pixel_ratio = scaled_pixmap.devicePixelRatio()
+            
             # Create the target pixmap
             result = QPixmap(button_size * pixel_ratio)
             result.setDevicePixelRatio(pixel_ratio)
             result.fill(Qt.GlobalColor.transparent)
             
-            # Load and scale the icon
-            pixmap = QPixmap(icon_path)
-            if pixmap.isNull():
-                print(f"Failed to load icon: {icon_path}")
-                return
-                
-            # Scale to fill the entire button (40x40)
-            scaled_size = button_size * pixel_ratio
-            scaled_pixmap = pixmap.scaled(
-                scaled_size,
-                Qt.AspectRatioMode.IgnoreAspectRatio,  # Fill the entire area
-                Qt.TransformationMode.SmoothTransformation
-            )
-            scaled_pixmap.setDevicePixelRatio(pixel_ratio)
-            
             # Fill the entire button
             x_offset = 0
             y_offset = 0
@@ -716,6 +1256,9 @@ class ShittyYTDLPHelper(QWidget):
     
     def perform_update(self):
         """Download and install the latest yt-dlp version."""
+        if self.update_thread and self.update_thread.is_alive():
+            return  # Already updating
+        
         if not self.download_url:
             self.show_custom_message("Error", "Could not fetch yt-dlp release information.", is_error=True)
             return
@@ -800,89 +1343,99 @@ class ShittyYTDLPHelper(QWidget):
             if dialog.exec() != 1:
                 return
         
+        # Show download progress
+        msg = QDialog(self)
+        msg.setWindowFlags(Qt.Dialog | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        msg.setAttribute(Qt.WA_TranslucentBackground)
+        msg.setFixedSize(400, 150)
+        
+        # Main container
+        container = QWidget(msg)
+        container.setObjectName("container")
+        container.setStyleSheet("""
+            QWidget#container {
+                background-color: #2a2a2a;
+                border: 3px solid white;
+                border-radius: 15px;
+                padding: 20px;
+            }
+            QLabel {
+                color: white;
+                font-size: 16px;
+                padding: 10px;
+                text-align: center;
+            }
+        """)
+        
+        # Layout
+        layout = QVBoxLayout(container)
+        
+        # Message
+        message = QLabel("Downloading the latest version of yt-dlp...")
+        message.setWordWrap(True)
+        message.setAlignment(Qt.AlignCenter)
+        
+        # Add message to layout
+        layout.addWidget(message)
+        
+        # Set layout
+        container.setLayout(layout)
+        
+        # Center on screen
+        msg.move(
+            self.x() + (self.width() - msg.width()) // 2,
+            self.y() + (self.height() - msg.height()) // 2
+        )
+        
+        msg.show()
+        self.update_dialog = msg
+        self.update_message = message
+        
+        # The binary lives next to the helper, not wherever we were started from
+        target_file = os.path.join(
+            self.project_dir, "yt-dlp.exe" if platform.system() == "Windows" else "yt-dlp"
+        )
+        updater = YtdlpUpdater(target_file, self.download_url, progress=self.update_progress_signal.emit)
+        self.update_thread = threading.Thread(target=self.run_update, args=(updater,), daemon=True)
+        self.update_thread.start()
+    
+    def run_update(self, updater):
+        """Download and swap in the new binary, runs on a worker thread."""
         try:
-            # Show download progress
-            msg = QDialog(self)
-            msg.setWindowFlags(Qt.Dialog | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-            msg.setAttribute(Qt.WA_TranslucentBackground)
-            msg.setFixedSize(400, 150)
-            
-            # Main container
-            container = QWidget(msg)
-            container.setObjectName("container")
-            container.setStyleSheet("""
-                QWidget#container {
-                    background-color: #2a2a2a;
-                    border: 3px solid white;
-                    border-radius: 15px;
-                    padding: 20px;
-                }
-                QLabel {
-                    color: white;
-                    font-size: 16px;
-                    padding: 10px;
-                    text-align: center;
-                }
-            """)
-            
-            # Layout
-            layout = QVBoxLayout(container)
-            
-            # Message
-            message = QLabel("Downloading the latest version of yt-dlp...")
-            message.setWordWrap(True)
-            message.setAlignment(Qt.AlignCenter)
-            
-            # Add message to layout
-            layout.addWidget(message)
-            
-            # Set layout
-            container.setLayout(layout)
-            
-            # Center on screen
-            msg.move(
-                self.x() + (self.width() - msg.width()) // 2,
-                self.y() + (self.height() - msg.height()) // 2
-            )
-            
-            msg.show()
-            QApplication.processEvents()
-            
-            # Download the file
-            r = requests.get(self.download_url, stream=True, timeout=10)
-            if r.status_code == 200:
-                temp_file = "yt-dlp.tmp"
-                with open(temp_file, "wb") as f:
-                    shutil.copyfileobj(r.raw, f)
-                
-                # Replace the existing file
-                target_file = "yt-dlp.exe" if platform.system() == "Windows" else "yt-dlp"
-                if os.path.exists(target_file):
-                    backup_file = f"{target_file}.old"
-                    if os.path.exists(backup_file):
-                        os.remove(backup_file)
-                    os.rename(target_file, backup_file)
-                
-                os.rename(temp_file, target_file)
-                
-                # On Unix-like systems, make the file executable
-                if platform.system() != "Windows":
-                    os.chmod(target_file, 0o755)
-                
-                msg.close()
-                self.show_custom_message("Update Complete", "yt-dlp has been successfully updated!")
-                self.update_available = False
-                self.style_update_button()
-                
-            else:
-                msg.close()
-                self.show_custom_message("Download Failed", "Failed to download the latest version.", is_error=True)
-                
+            updater.run()
+            # Probing the new binary's version can take seconds, do it here rather than on the GUI thread
+            self.updated_engine = create_engine(self.project_dir, self.downloads_dir, self.bandwidth, self.disk_budget)
+            self.update_finished_signal.emit("")
         except Exception as e:
-            if 'msg' in locals():
-                msg.close()
-            self.show_custom_message("Update Error", f"An error occurred: {str(e)}", is_error=True)
+            print(f"Update failed: {e}")
+            self.update_finished_signal.emit(str(e))
+    
+    def show_update_progress(self, done, total):
+        """Show how far the update download got."""
+        if not self.update_dialog:
+            return
+        if total:
+            self.update_message.setText(
+                f"Downloading the latest version of yt-dlp...\n"
+                f"{done * 100 // total}% ({format_bytes(done)} of {format_bytes(total)})"
+            )
+        else:
+            self.update_message.setText(f"Downloading the latest version of yt-dlp...\n{format_bytes(done)}")
+    
+    def finish_update(self, error):
+        """Close the progress dialog and report how the update went."""
+        if self.update_dialog:
+            self.update_dialog.close()
+            self.update_dialog = None
+        if error:
+            self.show_custom_message("Update Error", f"An error occurred: {error}", is_error=True)
             self.url_input.setFocus()
+            return
+        # Downloads starting from now on use the new yt-dlp
+        self.use_engine(self.updated_engine)
+        self.show_custom_message("Update Complete", "yt-dlp has been successfully updated!")
+        self.update_available = False
+        self.style_update_button()
 
     def show_custom_message(self, title, message, is_error=False):
         """Show a custom styled message box without titlebar
@@ -1017,6 +1570,46 @@ class ShittyYTDLPHelper(QWidget):
         # Start the dialog's event loop
         dialog.exec()
     
+    def dropped_files(self, mime):
+        """Local files in a drag, if that's what it carries."""
+        if not mime.hasUrls():
+            return []
+        return [url.toLocalFile() for url in mime.urls() if url.isLocalFile()]
+
+    def dragEnterEvent(self, event):
+        if self.dropped_files(event.mimeData()) or event.mimeData().hasText():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        """Queue every URL in dropped text files or dropped text."""
+        mime = event.mimeData()
+        files = self.dropped_files(mime)
+        if files:
+            text = ""
+            for path in files:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        text += f.read(self.DROP_FILE_LIMIT) + "\n"
+                except OSError as e:
+                    print(f"Could not read dropped file {path}: {e}")
+        else:
+            text = mime.text()
+        urls = split_urls(text)
+        if urls:
+            event.acceptProposedAction()
+            self.ingest_urls(urls)
+
+    def eventFilter(self, obj, event):
+        # Files dropped on the URL box are read, not pasted in as file:// paths
+        if (obj is self.url_input and event.type() in (QEvent.DragEnter, QEvent.Drop)
+                and self.dropped_files(event.mimeData())):
+            if event.type() == QEvent.DragEnter:
+                event.acceptProposedAction()
+            else:
+                self.dropEvent(event)
+            return True
+        return super().eventFilter(obj, event)
+
     def keyPressEvent(self, event):
         """Handle key press events."""
         if event.key() == Qt.Key_Escape:
@@ -1030,6 +1623,9 @@ class ShittyYTDLPHelper(QWidget):
             if isinstance(widget, QDialog) and widget.isVisible():
                 widget.reject()
         
+        # Stop handing out queued downloads and stop running yt-dlp children, this also flushes the queue journal
+        self.download_queue.shutdown()
+        
         # Stop any running processes
         if hasattr(self, 'process') and self.process:
             try:
@@ -1069,6 +1665,12 @@ if __name__ == '__main__':
     
     window = ShittyYTDLPHelper()
     window.setWindowTitle("SYH - Shitty YTDLP Helper")
-    window.resize(420, 620)  # Increased height from 520px to 620px
+    window.resize(420, 760)  # Taller to fit the job list
     window.show()
+    
+    # instance and launch_urls are set up at the top, before the Qt imports
+    if instance:
+        instance.listen(window.receive_urls)
+    if launch_urls:
+        window.receive_urls(launch_urls)
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Single-instance lock and URL hand-over for Shitty YTDLP Helper.
+
+Only uses QtCore and QtNetwork, so a second launch can forward its URLs
+and exit without loading the widget modules.
+"""
+import os
+import sys
+import json
+import hashlib
+
+from PySide6.QtCore import QCoreApplication, QDir, QLockFile, QThread
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+
+class SingleInstance:
+    """Keeps one helper per install running and forwards URLs to it.
+
+    The first launch holds a lock file and listens on a local socket (a
+    named pipe on Windows). Later launches find the lock taken, send their
+    URLs over the socket and exit without ever building a window.
+    """
+
+    CONNECT_TIMEOUT_MS = 3000  # The first instance may still be starting up
+
+    def __init__(self, project_dir):
+        # Separate installs get separate instances
+        key = hashlib.sha1(os.path.abspath(project_dir).encode('utf-8')).hexdigest()[:12]
+        self.server_name = f"SYH-{key}"
+        self.lock = QLockFile(os.path.join(QDir.tempPath(), f"{self.server_name}.lock"))
+        self.server = None
+        self.on_urls = None
+        self._app = None
+
+    def acquire(self):
+        """True if this is the first instance. Stale locks of dead processes are taken over."""
+        return self.lock.tryLock(0)
+
+    def forward(self, urls):
+        """Hand URLs (or just a nudge to show the window) to the running instance."""
+        if QCoreApplication.instance() is None:
+            self._app = QCoreApplication(sys.argv[:1])  # Sockets want an application, not a GUI
+        socket = QLocalSocket()
+        waited = 0
+        while True:
+            socket.connectToServer(self.server_name)
+            if socket.waitForConnected(200):
+                break
+            waited += 300
+            if waited >= self.CONNECT_TIMEOUT_MS:
+                print(f"Could not reach the running instance: {socket.errorString()}")
+                if self._app:
+                    # The caller goes on to make its own QApplication
+                    self._app.shutdown()
+                    self._app = None
+                return False
+            QThread.msleep(100)
+        socket.write((json.dumps({'urls': urls}) + "\n").encode('utf-8'))
+        socket.waitForBytesWritten(1000)
+        socket.disconnectFromServer()
+        return True
+
+    def listen(self, on_urls):
+        """Start accepting URLs from later launches, on_urls(list) runs on the GUI thread."""
+        self.on_urls = on_urls
+        # Only a crashed instance leaves a socket behind, we hold the lock
+        QLocalServer.removeServer(self.server_name)
+        self.server = QLocalServer()
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._accept)
+        if not self.server.listen(self.server_name):
+            print(f"Single instance server failed: {self.server.errorString()}")
+
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read(self, socket):
+        while socket.canReadLine():
+            try:
+                message = json.loads(bytes(socket.readLine()).decode('utf-8'))
+            except ValueError:
+                continue
+            self.on_urls([url for url in message.get('urls', []) if isinstance(url, str)])
@@ -0,0 +1,44 @@
+import ytdlp_engine
+from ytdlp_engine import BandwidthBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_stalled_job_hands_its_share_to_the_others(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ytdlp_engine, 'time', clock)
+    budget = BandwidthBudget(global_limit=1024 * 1024)
+    done = {'healthy': 0, 'stalled': 0}
+
+    def tick(*job_ids):
+        # Each job gets 100 KiB per tenth of a second from the network, twice the whole budget
+        for job_id in job_ids:
+            done[job_id] += 100 * 1024
+            budget.throttle(job_id, done[job_id])
+        clock.now += 0.1
+
+    for _ in range(30):
+        tick('healthy', 'stalled')
+    shares = {job_id: flow.share for job_id, flow in budget._flows.items()}
+    assert shares['healthy'] == shares['stalled'] == 512 * 1024
+
+    # The stalled job stops calling its progress hook altogether
+    for _ in range(50):
+        tick('healthy')
+    flows = budget._flows
+    assert flows['stalled'].share == BandwidthBudget.MIN_SHARE
+    assert flows['healthy'].share == 1024 * 1024 - BandwidthBudget.MIN_SHARE
+
+    # Once it moves again it gets its fair share back
+    for _ in range(50):
+        tick('healthy', 'stalled')
+    assert flows['stalled'].share == flows['healthy'].share == 512 * 1024
@@ -0,0 +1,94 @@
+import shutil
+import threading
+
+import ytdlp_engine
+from ytdlp_engine import DEFAULT_OPTIONS, DONE, DiskBudget, DownloadJob, YtdlpEngine
+
+SIZE = 200 * 1024 ** 2
+
+
+def tight_budget(path):
+    # Room for one SIZE download and half of another, whatever the disk has free
+    return DiskBudget(margin=shutil.disk_usage(path).free - SIZE * 3 // 2)
+
+
+def finishes(target, timeout=30):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_reserving_again_replaces_the_jobs_reservation(tmp_path):
+    budget = tight_budget(tmp_path)
+    job = DownloadJob('https://example.com/video', {})
+    budget.reserve(job, SIZE, [str(tmp_path)])
+    assert finishes(lambda: budget.reserve(job, SIZE, [str(tmp_path)]))
+    assert len(budget._reserved[job.id]) == 1
+    budget.release(job.id)
+    assert not budget._reserved
+
+
+def test_jobs_reserving_again_do_not_wait_on_each_other(tmp_path):
+    budget = tight_budget(tmp_path)
+    jobs = [DownloadJob(f'https://example.com/video{i}', {}) for i in range(2)]
+    for job in jobs:
+        budget.reserve(job, SIZE * 2 // 3, [str(tmp_path)])
+    # Each full size reservation only fits once the other job's old one is gone
+    threads = [threading.Thread(target=budget.reserve, args=(job, SIZE, [str(tmp_path)]), daemon=True)
+               for job in jobs]
+    for thread in threads:
+        thread.start()
+    for _ in range(60):
+        if not all(thread.is_alive() for thread in threads):
+            break
+        threading.Event().wait(0.05)
+    first = next((i for i, thread in enumerate(threads) if not thread.is_alive()), None)
+    assert first is not None, "both jobs waited on each other's old reservation"
+
+    budget.release(jobs[first].id)
+    threads[1 - first].join(10)
+    assert not threads[1 - first].is_alive()
+    budget.release(jobs[1 - first].id)
+    assert not budget._reserved
+
+
+class StaleInfoCache:
+    """Hands out info whose media URL has expired, like a cache entry gone stale."""
+
+    def __init__(self, info):
+        self.info = info
+        self.invalidated = False
+
+    def key_for_url(self, url):
+        return ('generic', 'clip')
+
+    def get(self, key):
+        return None if self.invalidated else self.info
+
+    def put(self, key, info):
+        pass
+
+    def invalidate(self, key):
+        self.invalidated = True
+
+
+def test_stale_cached_info_does_not_wait_on_its_own_reservation(site, tmp_path, monkeypatch):
+    root, base_url = site
+    (root / 'clip.mp4').write_bytes(b'clip' * 4096)
+    url = f'{base_url}/clip.mp4'
+    cache = StaleInfoCache({
+        'id': 'clip', 'title': 'clip', 'extractor': 'generic', 'extractor_key': 'Generic', 'webpage_url': url,
+        'formats': [{'format_id': 'mp4', 'url': f'{base_url}/expired.mp4', 'ext': 'mp4'}],
+    })
+    # Both attempts look like SIZE downloads, only one of them fits next to the other
+    monkeypatch.setattr(ytdlp_engine, 'estimate_disk_usage', lambda info, rewritten=False: SIZE)
+    downloads = tmp_path / 'downloads'
+    disk = tight_budget(tmp_path)
+    engine = YtdlpEngine(str(tmp_path), str(downloads), info_cache=cache, disk=disk)
+    job = DownloadJob(url, dict(DEFAULT_OPTIONS, best_quality=False, use_ffmpeg=False))
+
+    assert finishes(lambda: engine.run(job)), "the fresh extraction waited for disk space forever"
+    assert cache.invalidated
+    assert job.state == DONE, job.error
+    assert not disk._reserved
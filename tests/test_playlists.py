@@ -0,0 +1,80 @@
+import time
+import shutil
+
+import pytest
+
+from ytdlp_engine import (
+    DEFAULT_OPTIONS, DONE, DownloadQueue, YtdlpEngine, YtdlpProcessEngine, PostProcessStage, _entry_job_info, inline_entries
+)
+
+# Single-file formats and no ffmpeg, the clips are only stand-ins
+OPTIONS = dict(DEFAULT_OPTIONS, best_quality=False, use_ffmpeg=False)
+
+INLINE_PAGE = """<html><head><title>Two clips</title></head><body>
+<video src="one.mp4"></video>
+<video src="two.mp4"></video>
+</body></html>
+"""
+
+
+def inline_site(site):
+    root, base_url = site
+    (root / 'page.html').write_text(INLINE_PAGE)
+    for name in ('one', 'two'):
+        (root / f'{name}.mp4').write_bytes(name.encode() * 4096)
+    return f'{base_url}/page.html'
+
+
+def run_queue(engine, url, timeout=60):
+    queue = DownloadQueue(engine, max_workers=3)
+    queue.submit(url, OPTIONS)
+    deadline = time.monotonic() + timeout
+    while queue.active_jobs():
+        assert time.monotonic() < deadline, f"queue still busy: {queue.jobs}"
+        # A playlist that keeps fanning itself out shows up as a growing queue
+        assert len(queue.jobs) < 10, f"playlist fanned out again: {queue.jobs}"
+        time.sleep(0.1)
+    queue.shutdown()
+    return queue.jobs
+
+
+def test_extracted_entries_are_not_queued_on_their_own():
+    page = 'https://example.com/page'
+    video = {'_type': 'video', 'id': '1', 'formats': [{'url': 'https://example.com/1.mp4'}], 'webpage_url': page}
+    assert _entry_job_info(video, page) is None
+    assert _entry_job_info({'_type': 'url', 'url': page + '#top'}, page) is None
+    link = _entry_job_info({'_type': 'url', 'url': 'https://example.com/watch?v=1', 'ie_key': 'Generic', 'id': '1'}, page)
+    assert link['url'] == 'https://example.com/watch?v=1'
+
+
+def test_inline_entries_are_detected_without_paging():
+    pulled = []
+
+    def pages():
+        for i in range(3):
+            pulled.append(i)
+            yield {'_type': 'url', 'url': f'https://example.com/{i}'}
+
+    entries, inline = inline_entries(pages())
+    assert not inline and pulled == [0]
+    assert len(list(entries)) == 3
+    assert inline_entries([{'_type': 'url', 'url': 'https://example.com/1'}, {'id': '2', 'formats': []}])[1]
+
+
+@pytest.mark.skipif(not shutil.which('yt-dlp'), reason="needs the yt-dlp executable")
+def test_process_engine_downloads_inline_entries_in_one_job(site, tmp_path):
+    downloads = tmp_path / 'downloads'
+    jobs = run_queue(YtdlpProcessEngine(str(tmp_path), str(downloads)), inline_site(site))
+    assert len(jobs) == 1
+    assert jobs[0].state == DONE, jobs[0].error
+    assert len(list(downloads.iterdir())) == 2
+
+
+@pytest.mark.parametrize('staged', [False, True], ids=['in-slot', 'post-processing-stage'])
+def test_engine_downloads_inline_entries_in_one_job(site, tmp_path, staged):
+    downloads = tmp_path / 'downloads'
+    engine = YtdlpEngine(str(tmp_path), str(downloads), postprocessing=PostProcessStage() if staged else None)
+    jobs = run_queue(engine, inline_site(site))
+    assert len(jobs) == 1
+    assert jobs[0].state == DONE, jobs[0].error
+    assert len(list(downloads.iterdir())) == 2
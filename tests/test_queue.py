@@ -0,0 +1,90 @@
+import sys
+import threading
+import time
+
+from ytdlp_engine import DONE, FAILED, DownloadQueue, QueueJournal, YtdlpProcessEngine, host_key
+
+
+class BlockingEngine:
+    """Holds every job in run() until released, playlists list their entries."""
+
+    def __init__(self, playlists=None):
+        self.playlists = playlists or {}
+        self.release = threading.Event()
+
+    def run(self, job):
+        if job.url in self.playlists:
+            return iter(self.playlists[job.url])
+        self.release.wait(10)
+        job.set_state(DONE)
+
+
+def test_resumed_jobs_coalesce_with_pasted_duplicates(tmp_path):
+    url = 'https://example.com/video.mp4'
+    journal = QueueJournal(str(tmp_path / 'queue.journal'))
+    first = DownloadQueue(BlockingEngine(), journal=journal)
+    first.submit_unique(url, {})
+    first.shutdown()
+
+    engine = BlockingEngine()
+    queue = DownloadQueue(engine, journal=QueueJournal(str(tmp_path / 'queue.journal')))
+    try:
+        resumed, = queue.resume_journaled()
+        job, is_new = queue.submit_unique(url + '#t=10', {})
+        assert job is resumed and not is_new
+    finally:
+        engine.release.set()
+        queue.shutdown()
+
+
+def test_playlist_entries_without_ids_coalesce_with_pasted_duplicates():
+    playlist = 'https://example.com/feed.xml'
+    entry_url = 'https://example.com/episode1.mp3'
+    engine = BlockingEngine({playlist: [{'url': entry_url, 'title': 'Episode 1', 'archive_id': None}]})
+    queue = DownloadQueue(engine)
+    try:
+        parent = queue.submit(playlist, {})
+        for _ in range(100):
+            if parent.children:
+                break
+            threading.Event().wait(0.05)
+        child, = parent.children
+        job, is_new = queue.submit_unique(entry_url, {})
+        assert job is child and not is_new
+    finally:
+        engine.release.set()
+        queue.shutdown()
+
+
+def test_shutdown_stops_running_children_and_keeps_their_jobs_journaled(tmp_path):
+    engine = YtdlpProcessEngine(str(tmp_path), str(tmp_path))
+    engine.ytdlp_command = lambda: [sys.executable, '-c', 'import time; time.sleep(60)']
+    queue = DownloadQueue(engine, journal=QueueJournal(str(tmp_path / 'queue.journal')))
+    job = queue.submit('https://example.com/video.mp4', {})
+    for _ in range(100):
+        if engine._processes:
+            break
+        time.sleep(0.05)
+    process, = engine._processes
+
+    started = time.monotonic()
+    queue.shutdown()
+    assert process.wait(5) is not None and time.monotonic() - started < 5
+    for _ in range(100):
+        if job.state == FAILED:
+            break
+        time.sleep(0.05)
+    assert job.state == FAILED
+    record, = QueueJournal(str(tmp_path / 'queue.journal')).unfinished()
+    assert record['url'] == job.url
+
+
+def test_sites_sharing_a_speed_profile_are_still_separate_hosts():
+    assert host_key('https://www.tiktok.com/@a/video/1') == 'tiktok.com'
+    assert host_key('https://vimeo.com/1') == 'vimeo.com'
+    assert host_key('https://x.com/a/status/1') == host_key('https://twitter.com/a/status/1') == 'twitter.com'
+    assert host_key('https://youtu.be/abc') == host_key('https://m.youtube.com/watch?v=abc') == 'youtube.com'
+    assert host_key('https://www.bbc.co.uk/iplayer') == 'bbc.co.uk'
+    assert host_key('https://www.itv.co.uk/watch') == 'itv.co.uk'
+    assert host_key('https://www.abc.net.au/news') == 'abc.net.au'
+    assert host_key('http://127.0.0.1:8080/v.mp4') == '127.0.0.1'
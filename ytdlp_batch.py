@@ -0,0 +1,161 @@
+"""Headless batch mode for Shitty YTDLP Helper.
+
+    shitty_ytdlphelper.py --batch urls.txt [options]
+    some-command | shitty_ytdlphelper.py --batch [options]
+
+Runs the URLs through the same engine, queue, archive and option mapping as
+the GUI and exits with a summary. Nothing here imports Qt, so it works on
+machines without a display and starts a lot faster. Parallel downloads,
+speed limits, the speed profile and archive skipping default to what the
+GUI saved in settings.ini.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import configparser
+
+from ytdlp_engine import (
+    DEFAULT_OPTIONS, DOWNLOAD_PROFILES, DONE, FAILED, DEFAULT_FREE_SPACE_MARGIN,
+    BandwidthBudget, DiskBudget, DownloadArchive, DownloadQueue, create_engine
+)
+
+
+def read_settings(project_dir):
+    """The [downloads] section the GUI keeps in settings.ini, read without Qt."""
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(os.path.join(project_dir, 'settings.ini'), encoding='utf-8')
+    except configparser.Error as e:
+        print(f"Ignoring unreadable settings.ini: {e}")
+        return {}
+    return dict(parser['downloads']) if parser.has_section('downloads') else {}
+
+
+def read_urls(path):
+    """URLs from a file or stdin ('-'), one per line. Blank lines and # comments are skipped."""
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def parse_args(argv, settings):
+    def setting_int(key, default):
+        try:
+            return int(settings.get(key, default))
+        except ValueError:
+            return default
+
+    parser = argparse.ArgumentParser(
+        prog='shitty_ytdlphelper.py',
+        description="Download a list of URLs without the GUI."
+    )
+    parser.add_argument('--batch', metavar='FILE', nargs='?', const='-', default='-',
+                        help="file with one URL per line, '-' or nothing reads stdin")
+    parser.add_argument('--output-dir', help="where downloads go (default: downloads next to the helper)")
+    parser.add_argument('--audio-only', action='store_true', help="download audio only")
+    parser.add_argument('--no-best-quality', action='store_true', help="don't pick the best video+audio")
+    parser.add_argument('--no-mp4', action='store_true', help="keep the original container")
+    parser.add_argument('--no-pretty-naming', action='store_true', help="use yt-dlp's default file names")
+    parser.add_argument('--embed-subs', action='store_true', help="embed subtitles")
+    parser.add_argument('--no-ffmpeg', action='store_true', help="don't use ffmpeg")
+    parser.add_argument('--fast-path', action='store_true',
+                        help="prefer streams that need no re-encoding, audio keeps its codec instead of mp3")
+    parser.add_argument('--profile', choices=['Auto'] + list(DOWNLOAD_PROFILES),
+                        default=settings.get('profile', 'Auto'), help="speed profile")
+    parser.add_argument('--workers', type=int, default=setting_int('max_workers', 3),
+                        help="parallel downloads")
+    parser.add_argument('--per-site', type=int, default=setting_int('per_host_limit', 2),
+                        help="parallel downloads from one site, 0 for no limit")
+    parser.add_argument('--limit-rate', type=int, default=setting_int('speed_limit', 0),
+                        help="total speed limit in bytes per second, 0 for none")
+    parser.add_argument('--keep-free', type=int,
+                        default=setting_int('free_space_margin', DEFAULT_FREE_SPACE_MARGIN),
+                        help="bytes of disk space to leave free, downloads wait until they fit")
+    parser.add_argument('--redownload', action='store_true',
+                        help="download URLs even if the archive has them")
+    return parser.parse_args(argv)
+
+
+def run_batch(argv, project_dir):
+    """Download every URL and print a summary. Returns the exit code."""
+    settings = read_settings(project_dir)
+    args = parse_args(argv, settings)
+    try:
+        urls = read_urls(args.batch)
+    except OSError as e:
+        print(f"Could not read URLs: {e}")
+        return 2
+    if not urls:
+        print("No URLs to download")
+        return 2
+
+    options = dict(
+        DEFAULT_OPTIONS,
+        best_quality=not args.no_best_quality,
+        mp4_output=not args.no_mp4,
+        pretty_naming=not args.no_pretty_naming,
+        audio_only=args.audio_only,
+        embed_subs=args.embed_subs,
+        use_ffmpeg=not args.no_ffmpeg,
+        fast_path=args.fast_path,
+        profile=args.profile,
+    )
+    downloads_dir = args.output_dir or os.path.join(project_dir, 'downloads')
+    os.makedirs(downloads_dir, exist_ok=True)
+
+    try:
+        per_job_limit = int(settings.get('per_job_limit', 0))
+    except ValueError:
+        per_job_limit = 0
+    bandwidth = BandwidthBudget(args.limit_rate or None, per_job_limit or None)
+    engine = create_engine(project_dir, downloads_dir, bandwidth, DiskBudget(args.keep_free))
+    if hasattr(engine, 'segment_transcodes'):
+        engine.segment_transcodes = settings.get('segment_transcodes', 'false') == 'true'
+    archive = DownloadArchive(os.path.join(project_dir, 'archive.jsonl'))
+
+    reported = set()
+    report_lock = threading.Lock()
+
+    def report(job):
+        # Called from worker threads on every progress tick, only finished jobs get a line
+        with report_lock:
+            if job.finished and job.id not in reported:
+                reported.add(job.id)
+                sys.stdout.write(job.status_text() + "\n")
+                sys.stdout.flush()
+
+    queue = DownloadQueue(engine, max_workers=args.workers, listener=report, archive=archive,
+                          per_host_limit=args.per_site)
+    queue.skip_archived = not args.redownload and settings.get('skip_archived', 'true') != 'false'
+    started = time.time()
+    duplicates = 0
+    for url in urls:
+        # The same video listed twice (or under two URL spellings) downloads once
+        job, is_new = queue.submit_unique(url, options)
+        if not is_new:
+            duplicates += 1
+            print(f"Already queued: {url}")
+    try:
+        while queue.active_jobs():
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        print("Interrupted, stopping downloads")
+        queue.shutdown()
+        return 130
+    queue.shutdown()
+
+    downloads = [job for job in queue.jobs if not job.is_group]
+    done = [job for job in downloads if job.state == DONE and not job.skipped]
+    skipped = [job for job in downloads if job.skipped]
+    failed = [job for job in downloads if job.state == FAILED]
+    print(f"\nFinished {len(urls)} URL(s) in {time.time() - started:.1f}s: "
+          f"{len(done)} downloaded, {len(skipped)} skipped, {len(failed)} failed"
+          + (f", {duplicates} duplicate(s) ignored" if duplicates else ""))
+    for job in failed:
+        print(f"  {job.url}: {job.error}")
+    return 1 if failed else 0
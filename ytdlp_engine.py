@@ -0,0 +1,2306 @@
+"""Download engine for Shitty YTDLP Helper.
+
+Everything in here is Qt-free on purpose: the GUI drives it from worker
+threads and nothing in this module touches widgets.
+"""
+import os
+import re
+import gzip
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import platform
+import functools
+import importlib.util
+import itertools
+import tempfile
+import subprocess
+import threading
+import traceback
+from collections import deque
+from urllib.parse import urlparse
+
+# Options the GUI checkboxes map onto, with the GUI defaults
+DEFAULT_OPTIONS = {
+    'best_quality': True,
+    'mp4_output': True,
+    'pretty_naming': True,
+    'audio_only': False,
+    'embed_subs': False,
+    'use_ffmpeg': True,
+    'fast_path': False,
+    'profile': 'Auto',
+}
+
+# Format selection for the fast path: streams that already fit an mp4, with
+# the regular selection as fallback. Best Quality keeps bestvideo+bestaudio,
+# merging those into an mp4 is a stream copy already.
+FAST_PATH_FORMATS = {
+    'default': 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/bv*+ba/b',
+    'audio_only': 'ba[ext=m4a]/ba/b',
+}
+
+# What yt-dlp says when a site rate limits us
+THROTTLE_RE = re.compile(r'HTTP Error 429|429 Client Error|Too Many Requests', re.IGNORECASE)
+
+# Disk space the queue leaves free when admitting downloads
+DEFAULT_FREE_SPACE_MARGIN = 1024 ** 3
+
+# Where update checks ask for the newest yt-dlp release
+RELEASES_API_URL = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
+
+# Transfer settings per download profile, in yt-dlp option terms.
+# concurrent_fragments only matters for DASH/HLS, chunking for plain HTTP.
+DOWNLOAD_PROFILES = {
+    'Standard': {},  # yt-dlp defaults, one fragment at a time
+    'Balanced': {
+        'concurrent_fragments': 4,
+        'http_chunk_size': '10M',
+    },
+    'High Latency': {
+        'concurrent_fragments': 8,
+        'http_chunk_size': '10M',
+        'buffer_size': '1M',
+    },
+}
+
+# What 'Auto' picks per site, first matching host suffix wins
+SITE_PROFILES = (
+    (('youtube.com', 'youtu.be'), 'Balanced'),
+    (('twitch.tv', 'vimeo.com', 'dailymotion.com', 'tiktok.com', 'twitter.com', 'x.com'), 'High Latency'),
+)
+AUTO_FALLBACK_PROFILE = 'Balanced'
+
+# Short and alternate domains of a site, they share its per-site limit and backoff
+HOST_ALIASES = {
+    'youtu.be': 'youtube.com',
+    'youtube-nocookie.com': 'youtube.com',
+    'x.com': 'twitter.com',
+    'fb.watch': 'facebook.com',
+    'redd.it': 'reddit.com',
+    'dai.ly': 'dailymotion.com',
+}
+# Second level labels that are public suffixes under country TLDs, as in co.uk or com.au
+COUNTRY_SECOND_LEVELS = {'co', 'com', 'net', 'org', 'gov', 'edu', 'ac', 'ne', 'or', 'go', 'gob', 'ltd', 'plc'}
+
+# Job states, in the order a job normally goes through them
+QUEUED = 'queued'
+EXTRACTING = 'extracting'
+WAITING_FOR_SPACE = 'waiting for disk space'
+DOWNLOADING = 'downloading'
+POST_PROCESSING = 'post-processing'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED_STATES = (DONE, FAILED)
+RUNNING_STATES = (EXTRACTING, WAITING_FOR_SPACE, DOWNLOADING, POST_PROCESSING)
+
+# What ffmpeg did to a finished job's output: stream copies only, or a re-encode
+REMUXED = 'remuxed'
+TRANSCODED = 'transcoded'
+# yt-dlp output lines of post-processors that have ffmpeg write a new file
+FFMPEG_REWRITE_RE = re.compile(
+    r'^\[(Merger\] Merging formats|ExtractAudio\] Destination|EmbedSubtitle\] Embedding subtitles'
+    r'|Fixup\w*\] Fixing|VideoRemuxer\] Remuxing|VideoConvertor\] Converting)'
+)
+
+# yt-dlp result types that get fanned out into one job per entry
+PLAYLIST_TYPES = ('playlist', 'multi_video')
+# Playlist entries that only point at a video, as opposed to already extracted ones
+REFERENCE_TYPES = ('url', 'url_transparent')
+
+
+def ytdlp_module_available():
+    """Check whether the yt_dlp Python package can be imported.
+
+    Only looks for it, actually importing yt_dlp takes a good part of a
+    second and is left to preload_ytdlp() or the first download.
+    """
+    try:
+        return importlib.util.find_spec('yt_dlp') is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def ytdlp_module_version():
+    """Version of the importable yt_dlp package, read without importing it. None if unknown."""
+    try:
+        spec = importlib.util.find_spec('yt_dlp')
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    try:
+        with open(os.path.join(list(spec.submodule_search_locations)[0], 'version.py'), encoding='utf-8') as f:
+            match = re.search(r"^__version__ = '([^']+)'", f.read(), re.MULTILINE)
+    except OSError:
+        return None  # Frozen builds only carry the compiled module
+    return match.group(1) if match else None
+
+
+def version_key(version):
+    """A yt-dlp version (2024.08.06, nightlies add .232345) as a comparable tuple, () if unknown."""
+    return tuple(int(part) for part in re.findall(r'\d+', version or ''))
+
+
+def update_cache_path(project_dir):
+    """Where UpdateChecker keeps its cached answers."""
+    return os.path.join(project_dir, 'cache', 'update.json')
+
+
+def preload_ytdlp():
+    """Import yt_dlp ahead of the first download, meant for a worker thread."""
+    try:
+        import yt_dlp  # noqa: F401
+    except ImportError:
+        pass
+
+
+def find_local_tool(project_dir, name):
+    """Return the path of a tool sitting next to the helper, or None."""
+    exe_name = f"{name}.exe" if platform.system() == "Windows" else name
+    path = os.path.join(project_dir, exe_name)
+    return path if os.path.isfile(path) else None
+
+
+def registrable_domain(host):
+    """media.example.com -> example.com, and media.example.co.uk -> example.co.uk.
+
+    Good enough without a public suffix list: two letter TLDs whose
+    second level is one of COUNTRY_SECOND_LEVELS keep a third label.
+    """
+    labels = host.split('.')
+    country = len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in COUNTRY_SECOND_LEVELS
+    return '.'.join(labels[-3:] if country else labels[-2:])
+
+
+def host_key(url):
+    """The site a URL belongs to, for per-site limits and backoff.
+
+    Its registrable domain, with HOST_ALIASES mapping short links to
+    their site: youtu.be counts as youtube.com. Speed profiles group
+    sites too, but sites sharing a profile are still separate here.
+    """
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    if host.replace('.', '').isdigit() or ':' in host:
+        return host  # IP addresses are their own site
+    domain = registrable_domain(host)
+    return HOST_ALIASES.get(domain, domain)
+
+
+def is_throttle_error(message):
+    """Whether a yt-dlp error or warning means the site is rate limiting us."""
+    return bool(message) and THROTTLE_RE.search(message) is not None
+
+
+def resolve_profile(url, profile='Auto'):
+    """Name of the download profile to use for a URL."""
+    if profile in DOWNLOAD_PROFILES:
+        return profile
+    host = (urlparse(url).hostname or '').lower()
+    for suffixes, site_profile in SITE_PROFILES:
+        if any(host == suffix or host.endswith('.' + suffix) for suffix in suffixes):
+            return site_profile
+    return AUTO_FALLBACK_PROFILE
+
+
+def build_ytdlp_args(url, options, downloads_dir):
+    """Turn the GUI options into yt-dlp command line arguments (URL last)."""
+    args = []
+
+    # Handle the quality/format selection, audio-only wins over best quality.
+    # The fast path keeps audio in its own codec and prefers mp4-ready streams.
+    fast_path = options.get('fast_path')
+    use_ffmpeg = options.get('use_ffmpeg', True)
+    if not use_ffmpeg:
+        # Nothing can be merged or converted, so take single files as they come
+        if options.get('audio_only'):
+            args.extend(["-f", FAST_PATH_FORMATS['audio_only']])
+        else:
+            args.extend(["-f", "b[ext=mp4]/b" if options.get('mp4_output') else "b"])
+        args.extend(["--fixup", "never"])
+    elif options.get('audio_only'):
+        if fast_path:
+            args.extend(["-f", FAST_PATH_FORMATS['audio_only'], "-x"])
+        else:
+            args.extend(["-x", "--audio-format", "mp3"])
+    elif options.get('best_quality'):
+        args.extend(["-f", "bestvideo+bestaudio"])
+    elif fast_path and options.get('mp4_output'):
+        args.extend(["-f", FAST_PATH_FORMATS['default']])
+
+    if options.get('mp4_output') and not options.get('audio_only') and use_ffmpeg:
+        args.extend(["--merge-output-format", "mp4"])
+
+    # Set output template
+    if options.get('pretty_naming'):
+        output_template = os.path.join(downloads_dir, '%(title)s.%(ext)s')
+    else:
+        output_template = os.path.join(downloads_dir, '%(title)s-%(id)s.%(ext)s')
+
+    args.extend(['-o', output_template])
+
+    if options.get('embed_subs'):
+        # Without ffmpeg the subtitles can only go next to the video
+        args.append("--embed-subs" if use_ffmpeg else "--write-subs")
+
+    # Transfer tuning from the download profile
+    profile = DOWNLOAD_PROFILES[resolve_profile(url, options.get('profile', 'Auto'))]
+    if profile.get('concurrent_fragments'):
+        args.extend(["-N", str(profile['concurrent_fragments'])])
+    if profile.get('http_chunk_size'):
+        args.extend(["--http-chunk-size", profile['http_chunk_size']])
+    if profile.get('buffer_size'):
+        args.extend(["--buffer-size", profile['buffer_size']])
+
+    # Add the URL at the end
+    args.append(url)
+    return args
+
+
+def build_ydl_opts(url, options, downloads_dir):
+    """Build YoutubeDL params equivalent to build_ytdlp_args().
+
+    The arguments are run through yt-dlp's own option parser so the
+    in-process engine behaves exactly like the command line would.
+    """
+    import yt_dlp
+
+    args = build_ytdlp_args(url, options, downloads_dir)[:-1]
+    return yt_dlp.parse_options(args).ydl_opts
+
+
+def ffmpeg_output_kind(line):
+    """REMUXED or TRANSCODED if a line of yt-dlp output says ffmpeg writes a new file, else None.
+
+    Post-processors that find nothing to do say so instead ("There aren't
+    any subtitles to embed", "Not converting audio"), and leave the file alone.
+    """
+    if not FFMPEG_REWRITE_RE.match(line):
+        return None
+    # Only an mp3 ever comes out of an audio re-encode, kept audio keeps its own extension
+    if line.startswith('[ExtractAudio]') and line.endswith('.mp3'):
+        return TRANSCODED
+    # The recode step re-encodes every stream, unlike VideoRemuxer
+    if line.startswith('[VideoConvertor]'):
+        return TRANSCODED
+    return REMUXED
+
+
+def estimate_disk_usage(info, rewritten=False):
+    """Peak bytes a download takes on disk, from the selected formats. 0 when unknown.
+
+    rewritten means post-processing (merging, converting, embedding) writes
+    a second file next to the download, which doubles the peak.
+    """
+    total = 0
+    for fmt in info.get('requested_formats') or [info]:
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and info.get('duration'):
+            size = fmt['tbr'] * 1000 / 8 * info['duration']  # tbr is in kbit/s
+        if not size:
+            return 0
+        total += size
+    return int(total * 2 if rewritten else total)
+
+
+def format_bytes(num):
+    """Human readable byte count, e.g. 12.3 MiB."""
+    if num is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(num) < 1024:
+            return f"{num:.1f} {unit}" if unit != "B" else f"{int(num)} B"
+        num /= 1024
+    return f"{num:.1f} TiB"
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds as m:ss or h:mm:ss."""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_id(url):
+    """Map a URL to (extractor key, video id) without touching the network.
+
+    Uses the same first-match-wins extractor order as yt-dlp itself.
+    Returns None for URLs only the generic extractor would take, or when
+    the yt_dlp package is not available.
+    """
+    try:
+        from yt_dlp.extractor import gen_extractor_classes
+    except ImportError:
+        return None
+    for ie in gen_extractor_classes():
+        if ie.suitable(url):
+            if ie.ie_key() == 'Generic':
+                return None
+            video_id = ie.get_temp_id(url)
+            return (ie.ie_key(), video_id) if video_id else None
+    return None
+
+
+def split_urls(text):
+    """Every http(s) URL in a pasted blob, in order. Anything else is ignored."""
+    urls = re.findall(r'https?://\S+', text or '', re.IGNORECASE)
+    # Link dumps often wrap URLs in brackets, quotes or end them with a full stop
+    return [url.rstrip('.,;)]>"\'') for url in urls]
+
+
+def normalize_url(url):
+    """URL with the fragment dropped and scheme and host lowercased."""
+    parsed = urlparse(url.strip())
+    return parsed._replace(
+        scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), fragment=''
+    ).geturl()
+
+
+def dedup_key(url):
+    """What makes two URLs the same download: (extractor, id) when yt-dlp can
+    tell offline, the normalized URL otherwise."""
+    ids = canonical_id(url)
+    return archive_id(*ids) if ids else ('url', normalize_url(url))
+
+
+class InfoCache:
+    """On-disk cache of extracted info dicts, gzip compressed.
+
+    Entries are keyed by (extractor, id), expire after `ttl` seconds
+    because the media URLs inside them are signed and go stale, and the
+    least recently used ones are evicted once the cache grows past
+    `max_bytes`. File mtimes double as the LRU clock.
+    """
+
+    DEFAULT_TTL = 30 * 60
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {}  # path -> size in bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.endswith('.json.gz') and os.path.isfile(path):
+                self._sizes[path] = os.path.getsize(path)
+
+    def key_for_url(self, url):
+        """Cache key for a URL, falling back to the URL itself."""
+        return canonical_id(url) or ('url', url)
+
+    def _path(self, key):
+        extractor, video_id = key
+        digest = hashlib.sha1(f"{extractor}\0{video_id}".encode('utf-8')).hexdigest()[:16]
+        safe_id = re.sub(r'[^\w-]', '_', str(video_id))[:40]
+        return os.path.join(self.cache_dir, f"{extractor}_{safe_id}_{digest}.json.gz")
+
+    def get(self, key):
+        """Return the cached info for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Dropping unreadable cache entry {path}: {e}")
+            self.invalidate(key)
+            return None
+
+        if time.time() - (info.get('epoch') or 0) > self.ttl:
+            self.invalidate(key)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return info
+
+    def put(self, key, info):
+        """Store a JSON-serialisable info dict."""
+        path = self._path(key)
+        info.setdefault('epoch', int(time.time()))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump(info, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not cache info for {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._sizes[path] = os.path.getsize(path)
+            self._evict()
+
+    def invalidate(self, key):
+        path = self._path(key)
+        with self._lock:
+            self._sizes.pop(path, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Caller holds the lock
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(self._sizes, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def archive_id(extractor, video_id):
+    """Archive key in yt-dlp's --download-archive form: lowercase extractor + id."""
+    if not extractor or not video_id:
+        return None
+    return (str(extractor).lower(), str(video_id))
+
+
+class DownloadArchive:
+    """Persistent record of finished downloads.
+
+    Stored as JSON lines (extractor, id, output path, size, timestamp) and
+    held in memory as a set of (extractor, id) keys, so checking a URL
+    costs no network round trip. Can import and export yt-dlp's plain
+    --download-archive files ("extractor id" per line).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._ids = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash, skip it
+                    key = archive_id(record.get('extractor'), record.get('id'))
+                    if key:
+                        self._ids.add(key)
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def key_for_url(self, url):
+        """Archive key for a URL, or None if it cannot be told offline."""
+        ids = canonical_id(url)
+        return archive_id(*ids) if ids else None
+
+    def add(self, key, path=None, size=None):
+        """Record a finished download."""
+        if not key or key in self._ids:
+            return
+        record = {
+            'extractor': key[0],
+            'id': key[1],
+            'path': path,
+            'size': size,
+            'time': int(time.time()),
+        }
+        with self._lock:
+            self._ids.add(key)
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Could not write download archive: {e}")
+
+    def import_ytdlp(self, path):
+        """Merge a yt-dlp --download-archive file, returns the number of new entries."""
+        added = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split(None, 1)
+                if len(parts) != 2:
+                    continue
+                key = archive_id(*parts)
+                if key not in self._ids:
+                    self.add(key)
+                    added += 1
+        return added
+
+    def export_ytdlp(self, path):
+        """Write all entries as a yt-dlp --download-archive file, returns the count."""
+        with self._lock:
+            keys = sorted(self._ids)
+        with open(path, 'w', encoding='utf-8') as f:
+            for extractor, video_id in keys:
+                f.write(f"{extractor} {video_id}\n")
+        return len(keys)
+
+
+class QueueJournal:
+    """Append-only journal of submitted downloads, so a restart can resume them.
+
+    One JSON object per line: an "add" record when a URL is submitted and
+    a "finish" record when it is done or failed. Writes are batched by a
+    background thread and fsynced once per batch. Only top-level jobs are
+    journaled: a resumed playlist is simply enumerated again, the archive
+    skips entries that finished and yt-dlp continues the .part files of
+    the ones that were in flight. The journal is compacted to the
+    unfinished jobs every time it is opened.
+    """
+
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, path):
+        self.path = path
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._unfinished = self._replay()
+        self._compact()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def _replay(self):
+        unfinished = {}  # Insertion ordered, so resumed jobs keep their order
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash
+                    if record.get('op') == 'add':
+                        unfinished[record['id']] = record
+                    elif record.get('op') == 'finish':
+                        unfinished.pop(record.get('id'), None)
+        except FileNotFoundError:
+            pass
+        return unfinished
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self._unfinished.values():
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not compact queue journal: {e}")
+
+    def unfinished(self):
+        """Add records of jobs that never finished, oldest first."""
+        return list(self._unfinished.values())
+
+    def job_added(self, job):
+        self._append({
+            'op': 'add',
+            'id': job.journal_id,
+            'url': job.url,
+            'options': job.options,
+            # Canonicalizing can load yt-dlp's extractors, too slow to redo at startup
+            'key': job.dedup_key,
+            'time': int(time.time()),
+        })
+
+    def job_finished(self, job):
+        self._append({'op': 'finish', 'id': job.journal_id, 'state': job.state})
+
+    def _append(self, record):
+        with self._cond:
+            if self._closed:
+                return
+            self._buffer.append(json.dumps(record) + "\n")
+            self._cond.notify()
+
+    def _write_batch(self):
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(batch)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Could not write queue journal: {e}")
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # Let more records pile up so one fsync covers them all
+            time.sleep(self.FLUSH_INTERVAL)
+            self._write_batch()
+
+    def close(self):
+        """Write out everything still buffered and stop the writer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=2)
+        self._write_batch()
+
+
+class UpdateChecker:
+    """Cached yt-dlp update check.
+
+    binary_path is the yt-dlp executable downloads run with, or None when
+    they run in-process on the bundled yt_dlp package.
+
+    The latest release is remembered for `ttl` seconds and refreshed with a
+    conditional request, so an unchanged release costs a 304 instead of the
+    whole JSON. The local version is remembered against the binary's mtime
+    and size and only probed with `--version` again when the file changes,
+    which matters for onefile builds that take seconds to unpack.
+    """
+
+    TTL = 6 * 3600
+
+    def __init__(self, cache_path, binary_path, api_url=RELEASES_API_URL, ttl=TTL):
+        self.cache_path = cache_path
+        self.binary_path = binary_path
+        self.api_url = api_url
+        self.ttl = ttl
+        self.asset_name = "yt-dlp.exe" if platform.system() == "Windows" else "yt-dlp"
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, cache):
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not save update cache: {e}")
+
+    def _latest_release(self, cache, force):
+        release = cache.get('release')
+        if release and not force and time.time() - cache.get('checked', 0) < self.ttl:
+            return release
+        import requests  # Only needed once the cached answer went stale
+        headers = {'Accept': 'application/vnd.github+json'}
+        if release and cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        try:
+            r = requests.get(self.api_url, headers=headers, timeout=5)
+        except requests.RequestException as e:
+            print(f"Failed to check for updates: {e}")
+            return release
+        if r.status_code == 304:
+            print("Latest release unchanged since last check")
+        elif r.ok:
+            data = r.json()
+            # Keep only what we use, the full answer lists every asset's metadata
+            release = {
+                'tag_name': data.get('tag_name'),
+                'assets': {
+                    asset.get('name'): asset.get('browser_download_url')
+                    for asset in data.get('assets', [])
+                },
+            }
+            cache['release'] = release
+            cache['etag'] = r.headers.get('ETag')
+        else:
+            print(f"Failed to check for updates: HTTP {r.status_code}")
+            return release
+        cache['checked'] = time.time()
+        return release
+
+    def _local_version(self, cache, probe=True):
+        if not self.binary_path:
+            return ytdlp_module_version()  # In-process downloads, the bundled package counts
+        try:
+            st = os.stat(self.binary_path)
+        except OSError:
+            return None
+        stamp = [st.st_mtime_ns, st.st_size]
+        local = cache.get('local')
+        if local and local.get('path') == self.binary_path and local.get('stamp') == stamp:
+            return local.get('version')
+        if not probe:
+            return None
+        version = None
+        try:
+            run_args = {"capture_output": True, "text": True, "timeout": 60}
+            if platform.system() == "Windows":
+                run_args["creationflags"] = subprocess.CREATE_NO_WINDOW
+            out = subprocess.run([self.binary_path, "--version"], **run_args)
+            if out.returncode == 0:
+                version = out.stdout.strip()
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Failed to get local yt-dlp version: {e}")
+        cache['local'] = {'path': self.binary_path, 'stamp': stamp, 'version': version}
+        return version
+
+    def local_version(self, probe=True):
+        """Version of binary_path (the bundled package without one), probed only when it changed.
+
+        Without probe only a cached version is returned, None if the file changed since.
+        """
+        cache = self._load()
+        version = self._local_version(cache, probe)
+        if probe:
+            self._save(cache)
+        return version
+
+    def check(self, force=False):
+        """Return (latest version, download url, local version, update available).
+
+        force skips the TTL but still sends the ETag.
+        """
+        cache = self._load()
+        release = self._latest_release(cache, force) or {}
+        local_version = self._local_version(cache)
+        self._save(cache)
+        latest_version = release.get('tag_name')
+        download_url = release.get('assets', {}).get(self.asset_name)
+        update_available = local_version is None or local_version != latest_version
+        return latest_version, download_url, local_version, update_available
+
+
+class YtdlpUpdater:
+    """Downloads a new yt-dlp binary next to the helper and swaps it in.
+
+    The download streams into `<target>.part`, so a dropped connection
+    resumes from where it stopped with a Range request next time. The file
+    is checked against the release's SHA2-256SUMS before it replaces the
+    old binary. Meant to run on a worker thread, progress(done, total) is
+    called from there.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    SUMS_NAME = 'SHA2-256SUMS'
+
+    def __init__(self, target_path, download_url, progress=None):
+        self.target_path = target_path
+        self.download_url = download_url
+        self.progress = progress
+        self.part_path = target_path + '.part'
+
+    def expected_sha256(self, requests):
+        # The checksum file sits next to the binary in the release
+        asset_name = self.download_url.rsplit('/', 1)[-1]
+        sums_url = self.download_url.rsplit('/', 1)[0] + '/' + self.SUMS_NAME
+        r = requests.get(sums_url, timeout=10)
+        if not r.ok:
+            raise RuntimeError(f"Could not get {self.SUMS_NAME}: HTTP {r.status_code}")
+        for line in r.text.splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[1].lstrip('*') == asset_name:
+                return parts[0].lower()
+        raise RuntimeError(f"{asset_name} is not listed in {self.SUMS_NAME}")
+
+    def run(self):
+        """Download, verify and install. Raises RuntimeError on failure."""
+        import requests
+        expected = self.expected_sha256(requests)
+        resumed = os.path.exists(self.part_path)
+        if self._fetch(requests) != expected:
+            os.remove(self.part_path)
+            # A leftover part file may belong to an older release, try once from scratch
+            if not resumed or self._fetch(requests) != expected:
+                if os.path.exists(self.part_path):
+                    os.remove(self.part_path)
+                raise RuntimeError("Downloaded file failed the SHA-256 check")
+        if platform.system() != "Windows":
+            os.chmod(self.part_path, 0o755)
+        self._swap()
+
+    def _fetch(self, requests):
+        # Completes the part file and returns its SHA-256
+        digest = hashlib.sha256()
+        done = 0
+        headers = {}
+        if os.path.exists(self.part_path):
+            # Hash what we already have, the rest is hashed as it arrives
+            with open(self.part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    done += len(chunk)
+            headers['Range'] = f"bytes={done}-"
+        with requests.get(self.download_url, headers=headers, stream=True, timeout=10) as r:
+            if r.status_code == 416:
+                pass  # The partial file is already complete
+            elif r.status_code in (200, 206):
+                if r.status_code == 200 and done:
+                    # Server ignored the range, start over
+                    digest = hashlib.sha256()
+                    done = 0
+                total = int(r.headers.get('Content-Length', 0)) + done or None
+                with open(self.part_path, 'ab' if done else 'wb') as f:
+                    for chunk in r.iter_content(self.CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        done += len(chunk)
+                        if self.progress:
+                            self.progress(done, total)
+            else:
+                raise RuntimeError(f"Download failed: HTTP {r.status_code}")
+        return digest.hexdigest()
+
+    def _swap(self):
+        if platform.system() == "Windows" and os.path.exists(self.target_path):
+            # A running exe can't be replaced but can be renamed, so jobs
+            # still using the old binary keep running from the backup
+            backup = f"{self.target_path}.old"
+            try:
+                if os.path.exists(backup):
+                    os.remove(backup)
+            except OSError:
+                backup = f"{self.target_path}.{int(time.time())}.old"  # Old backup still running
+            os.replace(self.target_path, backup)
+        # Running processes keep their open copy on other systems
+        os.replace(self.part_path, self.target_path)
+
+
+def is_reference_entry(entry):
+    """Whether a playlist entry is a link to extract on its own, rather than an extracted video."""
+    if not entry:
+        return False
+    if entry.get('_type') in REFERENCE_TYPES:
+        return True
+    # Nested playlists get their own group, when they say where they live
+    return entry.get('_type') in PLAYLIST_TYPES and bool(entry.get('webpage_url'))
+
+
+def inline_entries(entries):
+    """Return (entries, inline) for a playlist's entries.
+
+    inline means the extractor already resolved its entries, like a page
+    with several <video> tags. Those have no URL of their own (at most the
+    page's), so a job per entry would only extract the page again, and the
+    playlist is downloaded as one job instead. Lists are checked whole,
+    lazy entries by their first one so no further pages are fetched.
+    """
+    if isinstance(entries, (list, tuple)):
+        return entries, any(entry and not is_reference_entry(entry) for entry in entries)
+    entries = iter(entries or [])
+    first = next(entries, None)
+    if first is None:
+        return [], False
+    return itertools.chain([first], entries), not is_reference_entry(first)
+
+
+def _entry_job_info(entry, parent_url=None):
+    """The (url, title, archive id) a queued job needs from one flat playlist entry.
+
+    None for entries that can't be a job of their own: extracted videos,
+    and links back to the playlist itself, which would only fan it out again.
+    """
+    if not is_reference_entry(entry):
+        return None
+    url = entry.get('webpage_url') or entry.get('url')
+    if not url or (parent_url and normalize_url(url) == normalize_url(parent_url)):
+        return None
+    return {
+        'url': url,
+        'title': entry.get('title'),
+        'archive_id': archive_id(entry.get('ie_key') or entry.get('extractor_key'), entry.get('id')),
+    }
+
+
+def stream_playlist_entries(entries, parent_url=None, on_close=None):
+    """Yield (url, title) dicts one by one as the extractor produces them.
+
+    `entries` may be a list or one of yt-dlp's lazy generators/paged lists,
+    which fetch further pages only as iteration reaches them. on_close runs
+    once the stream is exhausted or dropped, e.g. to close the YoutubeDL
+    instance the generator still needs for its page requests. Entries
+    that can't be queued on their own are left out, see inline_entries().
+    """
+    try:
+        for entry in entries or []:
+            job_info = _entry_job_info(entry, parent_url)
+            if job_info:
+                yield job_info
+            elif entry:
+                print(f"[{parent_url}] Skipping playlist entry {entry.get('id') or entry.get('title')}, "
+                      f"it has no link of its own")
+    finally:
+        if on_close:
+            on_close()
+
+
+class _Flow:
+    """Rate bookkeeping for one job inside a BandwidthBudget."""
+
+    def __init__(self, now, downloaded):
+        self.started = now
+        self.mark_time = now
+        self.mark_bytes = downloaded
+        self.last_time = now
+        self.last_bytes = downloaded
+        self.rate = 0.0
+        self.share = None
+
+    def reset_mark(self, now):
+        self.mark_time = now
+        self.mark_bytes = self.last_bytes
+
+
+class BandwidthBudget:
+    """Global download rate limit shared by all running jobs.
+
+    The global limit is split between active jobs by water-filling: a job
+    that uses less than its fair share (stalled, or slowed down by the
+    server) keeps roughly what it uses and the rest is handed to the
+    others. Shares are recomputed every REBALANCE_INTERVAL seconds and
+    whenever a job starts or finishes. An optional per-job cap applies on
+    top. Jobs are held back by sleeping in their progress hook, which
+    slows plain HTTP and concurrent fragment downloads alike.
+    """
+
+    REBALANCE_INTERVAL = 0.5
+    MIN_SHARE = 16 * 1024  # Never starve a job completely
+    MAX_BURST = 1.0  # Seconds of unused allowance a job may catch up on
+    MAX_SLEEP = 1.0
+    # A job without progress for this long is stalled. Longer than MAX_SLEEP,
+    # a job sleeping off its share isn't stalled.
+    STALL_TIME = 2.0
+
+    def __init__(self, global_limit=None, per_job_limit=None):
+        self.global_limit = global_limit
+        self.per_job_limit = per_job_limit
+        self._flows = {}
+        self._lock = threading.Lock()
+        self._last_rebalance = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.global_limit or self.per_job_limit)
+
+    def set_limits(self, global_limit=None, per_job_limit=None):
+        """Change the limits (bytes per second, None for unlimited)."""
+        with self._lock:
+            self.global_limit = global_limit or None
+            self.per_job_limit = per_job_limit or None
+            self._rebalance(time.monotonic())
+
+    def share_hint(self):
+        """Rate a job starting now would get, for downloaders that cannot be throttled live."""
+        with self._lock:
+            if not self.global_limit:
+                return self.per_job_limit
+            share = max(self.MIN_SHARE, self.global_limit // (len(self._flows) + 1))
+            return min(share, self.per_job_limit) if self.per_job_limit else share
+
+    def throttle(self, job_id, downloaded):
+        """Account for progress of a job and sleep if it is over its share."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            flow = self._flows.get(job_id)
+            if flow is None:
+                flow = self._flows[job_id] = _Flow(now, downloaded)
+                self._rebalance(now)
+            if downloaded < flow.last_bytes:
+                # Next file of the same job (e.g. audio after video)
+                flow.last_bytes = downloaded
+                flow.reset_mark(now)
+            elapsed = now - flow.last_time
+            if elapsed > 0:
+                instant = (downloaded - flow.last_bytes) / elapsed
+                flow.rate = 0.7 * flow.rate + 0.3 * instant
+            flow.last_time, flow.last_bytes = now, downloaded
+            if now - self._last_rebalance >= self.REBALANCE_INTERVAL:
+                self._rebalance(now)
+
+            share = flow.share
+            if not share:
+                return
+            delay = flow.mark_time + (downloaded - flow.mark_bytes) / share - now
+            if delay < -self.MAX_BURST:
+                # Don't let a slow stretch build up a huge burst allowance
+                flow.reset_mark(now)
+                return
+        if delay > 0:
+            time.sleep(min(delay, self.MAX_SLEEP))
+
+    def release(self, job_id):
+        """Forget a job that stopped downloading and hand its share to the others."""
+        with self._lock:
+            if self._flows.pop(job_id, None) is not None:
+                self._rebalance(time.monotonic())
+
+    def _rebalance(self, now):
+        # Caller holds the lock
+        self._last_rebalance = now
+        flows = list(self._flows.values())
+        if not flows:
+            return
+
+        if not self.global_limit:
+            shares = [self.per_job_limit] * len(flows)
+        else:
+            demands = []
+            for flow in flows:
+                young = now - flow.started < 2 * self.REBALANCE_INTERVAL
+                if now - flow.last_time > self.STALL_TIME:
+                    # Stalled jobs report no progress at all, so their rate never drops
+                    demand = self.MIN_SHARE
+                elif flow.share is None or young or flow.rate >= 0.8 * flow.share:
+                    demand = float('inf')  # Using all it gets, may want more
+                else:
+                    demand = max(self.MIN_SHARE, flow.rate * 1.25)
+                if self.per_job_limit:
+                    demand = min(demand, self.per_job_limit)
+                demands.append(demand)
+
+            # Water-filling: satisfy small demands, split the rest evenly
+            shares = [None] * len(flows)
+            remaining = float(self.global_limit)
+            order = sorted(range(len(flows)), key=lambda i: demands[i])
+            for position, i in enumerate(order):
+                fair = remaining / (len(order) - position)
+                shares[i] = max(self.MIN_SHARE, min(demands[i], fair))
+                remaining = max(0.0, remaining - shares[i])
+
+        for flow, share in zip(flows, shares):
+            if share != flow.share:
+                flow.share = share
+                flow.reset_mark(now)
+
+
+class _EngineLogger:
+    """Forward yt-dlp log output to stdout, prefixed with the job URL.
+
+    Warnings and errors about rate limiting are reported to the job, so
+    the queue can back off the site while yt-dlp is still retrying. So is
+    what ffmpeg did to the output, the same lines the process engine reads.
+    """
+
+    def __init__(self, prefix, job=None):
+        self.prefix = prefix
+        self.job = job
+
+    def debug(self, msg):
+        # yt-dlp sends regular screen output through debug() as well
+        if not msg.startswith('[debug] '):
+            print(f"{self.prefix} {msg}")
+            kind = ffmpeg_output_kind(msg) if self.job is not None else None
+            if kind:
+                self.job.note_processing(kind)
+
+    def info(self, msg):
+        print(f"{self.prefix} {msg}")
+
+    def warning(self, msg):
+        print(f"{self.prefix} WARNING: {msg}")
+        if self.job is not None and is_throttle_error(msg):
+            self.job.note_throttled()
+
+    def error(self, msg):
+        print(f"{self.prefix} {msg}")
+        if self.job is not None and is_throttle_error(msg):
+            self.job.note_throttled()
+
+
+class DiskBudget:
+    """Free disk space shared out between running downloads.
+
+    Before a job writes anything, its expected size is reserved against
+    the free space of every filesystem it writes to, keeping `margin`
+    bytes free. A job that doesn't fit waits until others finish and give
+    their reservation back. One that couldn't fit even with nothing else
+    running fails straight away instead of filling the disk halfway.
+    Reservations are held until the job finishes, so bytes already written
+    count twice; that errs on the side of waiting. Reserving again for the
+    same job (a retry, the next video of a page) replaces what it held,
+    and gives it up while waiting so two such jobs can't wait on each other.
+    """
+
+    RECHECK_INTERVAL = 5.0  # Space freed outside the app is noticed this quickly
+
+    def __init__(self, margin=DEFAULT_FREE_SPACE_MARGIN):
+        self.margin = margin
+        self._reserved = {}  # job id -> [(device, bytes)]
+        self._cond = threading.Condition()
+
+    def set_margin(self, margin):
+        with self._cond:
+            self.margin = margin
+            self._cond.notify_all()
+
+    @staticmethod
+    def _devices(paths):
+        """{device: path} for the filesystems the paths are on, missing paths count as their parent."""
+        devices = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            while not os.path.exists(path) and os.path.dirname(path) != path:
+                path = os.path.dirname(path)
+            devices.setdefault(os.stat(path).st_dev, path)
+        return devices
+
+    def reserve(self, job, size, paths):
+        """Wait until size bytes fit on the filesystems of paths, then hold them for the job."""
+        devices = self._devices(paths)
+        with self._cond:
+            while True:
+                blocked = None
+                for device, path in devices.items():
+                    free = shutil.disk_usage(path).free
+                    # The job's own earlier reservation is about to be replaced, waiting on it would never end
+                    held = sum(
+                        n for job_id, reservations in self._reserved.items() if job_id != job.id
+                        for d, n in reservations if d == device
+                    )
+                    if size + self.margin > free - held:
+                        blocked = (path, free, held)
+                        break
+                if blocked is None:
+                    self._reserved[job.id] = [(device, size) for device in devices]
+                    self._cond.notify_all()  # It may hold less than before
+                    if job.state == WAITING_FOR_SPACE:
+                        job.set_state(EXTRACTING)
+                    return
+                path, free, held = blocked
+                if not held:
+                    needed = f"{format_bytes(size)} plus " if size else ""
+                    raise RuntimeError(
+                        f"Not enough disk space in {path}: needs {needed}"
+                        f"{format_bytes(self.margin)} to spare, {format_bytes(free)} free"
+                    )
+                if self._reserved.pop(job.id, None) is not None:
+                    self._cond.notify_all()  # Whoever waits on what it held can go first
+                job.set_state(WAITING_FOR_SPACE)
+                self._cond.wait(self.RECHECK_INTERVAL)
+
+    def release(self, job_id):
+        """Give back what a finished job reserved."""
+        with self._cond:
+            if self._reserved.pop(job_id, None) is not None:
+                self._cond.notify_all()
+
+
+class DownloadJob:
+    """A single URL waiting in or going through the download queue."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, options):
+        self.id = next(self._ids)
+        self.url = url
+        self.options = dict(options)
+        self.state = QUEUED
+        self.title = None
+        self.error = None
+        self.archive_id = None  # (extractor, id) once known
+        self.filepath = None  # Final output file once known
+        self.skipped = False  # Already in the download archive
+        self.journal_id = None  # Set for top-level jobs when the queue keeps a journal
+        self.dedup_key = None  # Set when the queue coalesces duplicates of this job
+        self.processing = None  # REMUXED or TRANSCODED once ffmpeg touched the output
+        self.host = host_key(url)  # Per-site limits and backoff apply to this
+        self.throttled = False  # The site rate limited us, not yet seen by the queue
+        self.throttle_retries = 0
+        # Progress, updated from the worker thread while downloading
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.speed = None
+        self.eta = None
+        # Playlist jobs become a group: the parent holds the entry jobs
+        self.parent = None
+        self.children = []
+        self.enumerating = False  # Entries still being streamed in
+        self.children_done = 0
+        self.children_failed = 0
+        self._counted = False
+        self._listener = None
+
+    def set_state(self, state, error=None):
+        """Move the job to a new state and notify the queue."""
+        if state == self.state and error is None:
+            return
+        self.state = state
+        if error is not None:
+            self.error = error
+        if self._listener:
+            self._listener(self)
+
+    def note_throttled(self):
+        """Record that the site pushed back (HTTP 429), the queue backs off its host."""
+        self.throttled = True
+        if self._listener:
+            self._listener(self)
+
+    def note_processing(self, kind):
+        """Record what ffmpeg did to the output, a transcode outranks a remux."""
+        if self.processing != TRANSCODED:
+            self.processing = kind
+
+    def update_progress(self, downloaded=None, total=None, speed=None, eta=None):
+        """Record download progress. Cheap, meant to be called per chunk."""
+        if downloaded is not None:
+            self.downloaded_bytes = downloaded
+        if total is not None:
+            self.total_bytes = total
+        self.speed = speed
+        self.eta = eta
+        if self.state != DOWNLOADING:
+            self.set_state(DOWNLOADING)
+        elif self._listener:
+            self._listener(self)
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def is_group(self):
+        return bool(self.children)
+
+    @property
+    def percent(self):
+        if self.is_group:
+            # Aggregate over entries, finished ones count as complete
+            total = sum(100.0 if child.finished else (child.percent or 0.0) for child in self.children)
+            return total / len(self.children)
+        if not self.total_bytes:
+            return None
+        return min(100.0, 100.0 * self.downloaded_bytes / self.total_bytes)
+
+    def status_text(self):
+        """One line summary of the job for the GUI and the console."""
+        name = self.title or self.url
+        if self.is_group:
+            count = f"{len(self.children)}+" if self.enumerating else str(len(self.children))
+            text = f"[{self.percent:.0f}%] {name} - {self.children_done}/{count} done"
+            return text + (f", {self.children_failed} failed" if self.children_failed else "")
+        if self.state == DOWNLOADING:
+            percent = f"{self.percent:.0f}%" if self.percent is not None else format_bytes(self.downloaded_bytes)
+            speed = f"{format_bytes(self.speed)}/s" if self.speed else "--"
+            return f"[{percent}] {name} - {speed}, ETA {format_eta(self.eta)}"
+        if self.skipped:
+            return f"[skipped] {name} - already downloaded"
+        if self.state == QUEUED and self.throttle_retries:
+            return f"[queued] {name} - {self.host} is rate limiting, retry {self.throttle_retries}"
+        if self.state == FAILED:
+            return f"[failed] {name} - {self.error}"
+        if self.state == DONE and self.processing:
+            return f"[done] {name} - {self.processing}"
+        return f"[{self.state}] {name}"
+
+    def __repr__(self):
+        return f"<DownloadJob #{self.id} {self.state} {self.url}>"
+
+
+@functools.lru_cache(maxsize=None)
+def _staged_ydl_class():
+    # Built on first use, importing yt_dlp is slow
+    import yt_dlp
+
+    class StagedYoutubeDL(yt_dlp.YoutubeDL):
+        """YoutubeDL that can leave post-processing for later.
+
+        With `deferred` set to a list, post_process() only records what it
+        was asked to do and run_deferred() does it, so the download and
+        the ffmpeg work (merging, audio extraction, embedding) can happen
+        on different threads.
+        """
+
+        deferred = None
+        admit = None  # Called with each video's info right before it downloads
+
+        def process_info(self, info_dict):
+            if self.admit is not None:
+                self.admit(info_dict, bool(info_dict.get('requested_formats') or self._pps['post_process']))
+            return super().process_info(info_dict)
+
+        def post_process(self, filename, info, files_to_move=None):
+            has_work = info.get('__postprocessors') or self._pps['post_process'] or self._pps['after_move']
+            if self.deferred is None or not has_work:
+                return super().post_process(filename, info, files_to_move)
+            self.deferred.append((filename, info, files_to_move))
+            info['filepath'] = filename
+            return info
+
+        def run_deferred(self):
+            """Run the recorded post-processing, returns the final file paths."""
+            deferred, self.deferred = self.deferred, []
+            return [
+                super(StagedYoutubeDL, self).post_process(filename, info, files_to_move).get('filepath')
+                for filename, info, files_to_move in deferred
+            ]
+
+    return StagedYoutubeDL
+
+
+class PostProcessStage:
+    """Worker threads for the CPU-heavy tail of downloads.
+
+    Merging, audio extraction and subtitle embedding are ffmpeg runs. They
+    happen here instead of in the download slot, so the next download can
+    start while ffmpeg works. The stage is sized to the CPU cores,
+    independently of how many downloads run at once. The threads mostly
+    wait on ffmpeg processes, so they don't contend for the GIL.
+    """
+
+    def __init__(self, workers=None, cores=None):
+        self.cores = max(1, int(cores or os.cpu_count() or 1))
+        self.workers = max(1, int(workers or self.cores))
+        self._tasks = deque()
+        self._threads = 0
+        self._idle = 0
+        self._running = 0
+        self._cond = threading.Condition()
+
+    def thread_share(self):
+        """Threads an ffmpeg started now may use, the cores split between the running tasks."""
+        with self._cond:
+            return max(1, self.cores // max(1, self._running))
+
+    def submit(self, task):
+        """Run task() on a stage thread."""
+        with self._cond:
+            self._tasks.append(task)
+            if self._idle == 0 and self._threads < self.workers:
+                self._threads += 1
+                threading.Thread(target=self._worker_loop, daemon=True).start()
+            self._cond.notify()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._tasks:
+                    self._cond.wait()
+                self._idle -= 1
+                task = self._tasks.popleft()
+                self._running += 1
+            try:
+                task()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+
+class YtdlpEngine:
+    """Run downloads in-process through the yt_dlp Python API."""
+
+    def __init__(self, project_dir, downloads_dir, info_cache=None, bandwidth=None, postprocessing=None, disk=None):
+        self.project_dir = project_dir
+        self.downloads_dir = downloads_dir
+        self.info_cache = info_cache
+        self.bandwidth = bandwidth
+        self.disk = disk
+        # Where ffmpeg work goes once the data is in, None runs it in the download slot
+        self.postprocessing = postprocessing
+        # Split long audio re-encodes across cores, see segmented_transcode
+        self.segment_transcodes = False
+
+    def ytdlp_path(self):
+        """None, downloads run on the bundled yt_dlp package rather than an executable."""
+        return None
+
+    def make_ydl_opts(self, url, options):
+        """YoutubeDL params for one download."""
+        ydl_opts = build_ydl_opts(url, options, self.downloads_dir)
+        ydl_opts['logger'] = _EngineLogger(f"[{url}]")
+        ydl_opts['noprogress'] = True
+
+        # Same lookup the terminal path gets by running from project_dir
+        ffmpeg_path = find_local_tool(self.project_dir, 'ffmpeg')
+        if ffmpeg_path and options.get('use_ffmpeg', True) and not ydl_opts.get('ffmpeg_location'):
+            ydl_opts['ffmpeg_location'] = ffmpeg_path
+        return ydl_opts
+
+    def run(self, job):
+        """Download a single job, moving it through the job states.
+
+        Playlists are only flat-extracted; their entries are returned so
+        the queue can schedule each one as its own job, unless the extractor
+        already extracted them (see inline_entries), then they download
+        here one after another. With a post-processing
+        stage, this returns once the data is downloaded and the job finishes
+        on the stage.
+        """
+        def progress_hook(d):
+            if d.get('status') == 'downloading':
+                job.update_progress(
+                    d.get('downloaded_bytes'),
+                    d.get('total_bytes') or d.get('total_bytes_estimate'),
+                    d.get('speed'),
+                    d.get('eta')
+                )
+                if self.bandwidth and d.get('downloaded_bytes') is not None:
+                    self.bandwidth.throttle(job.id, d['downloaded_bytes'])
+            elif d.get('status') == 'finished':
+                job.set_state(POST_PROCESSING)
+            info_dict = d.get('info_dict') or {}
+            if not job.title:
+                job.title = info_dict.get('title')
+            if not job.archive_id:
+                job.archive_id = archive_id(info_dict.get('extractor_key'), info_dict.get('id'))
+
+        def post_hook(filepath):
+            # Called once per video with the final file, after post-processing
+            job.filepath = filepath
+
+        # yt-dlp reads postprocessor_args on every ffmpeg run, so refilling this
+        # list as each post-processor starts keeps the thread count current
+        ffmpeg_threads = []
+
+        def postprocessor_hook(d):
+            # What ffmpeg ends up doing is read from the log, see _EngineLogger
+            if d.get('status') == 'started':
+                job.set_state(POST_PROCESSING)
+                if self.postprocessing is not None:
+                    ffmpeg_threads[:] = ["-threads", str(self.postprocessing.thread_share())]
+
+        ydl_opts = self.make_ydl_opts(job.url, job.options)
+        ydl_opts['logger'] = _EngineLogger(f"[{job.url}]", job)
+        ydl_opts['progress_hooks'] = [progress_hook]
+        ydl_opts['postprocessor_hooks'] = [postprocessor_hook]
+        # Any post-processor's main ffmpeg output, unless the options name their own
+        ydl_opts['postprocessor_args'] = dict(ydl_opts.get('postprocessor_args') or {})
+        ydl_opts['postprocessor_args'].setdefault('ffmpeg', ffmpeg_threads)
+        ydl_opts['post_hooks'] = [post_hook]
+        # Playlist entries are only needed as URLs, never resolved here
+        ydl_opts['extract_flat'] = 'in_playlist'
+        # The CLI default only logs download errors, the job has to see them
+        ydl_opts['ignoreerrors'] = False
+
+        job.set_state(EXTRACTING)
+        ydl = _staged_ydl_class()(ydl_opts)
+        if self.postprocessing is not None:
+            ydl.deferred = []
+        if self.segment_transcodes:
+            from segmented_transcode import use_segmented_audio
+            use_segmented_audio(ydl)
+        if self.disk is not None:
+            write_paths = [self.downloads_dir] + [path for path in [(ydl_opts.get('paths') or {}).get('temp')] if path]
+            ydl.admit = lambda info, rewritten: self.disk.reserve(job, estimate_disk_usage(info, rewritten), write_paths)
+        try:
+            cache_key = self.info_cache.key_for_url(job.url) if self.info_cache else None
+            if not (cache_key and self.download_cached(ydl, job, cache_key)):
+                # Unprocessed result: playlist entries stay a lazy stream
+                info = ydl.extract_info(job.url, download=False, process=False)
+                # Follow plain redirects so a link that leads to a playlist still fans out
+                while info.get('_type') == 'url':
+                    info = ydl.extract_info(info['url'], download=False, ie_key=info.get('ie_key'), process=False)
+                job.title = job.title or info.get('title')
+
+                if info.get('_type') in PLAYLIST_TYPES:
+                    entries, inline = inline_entries(info.get('entries'))
+                    if not inline:
+                        # The stream keeps using (and finally closes) the YoutubeDL
+                        entries = stream_playlist_entries(entries, job.url, on_close=ydl.close)
+                        ydl = None
+                        return entries
+                    # Extracted videos on one page, nothing to queue separately
+                    job.archive_id = job.archive_id or archive_id(info.get('extractor_key'), info.get('id'))
+                    self.download_entries(ydl, job, info, entries)
+                else:
+                    if cache_key:
+                        # Raw, pre-format-selection info, good for any later options
+                        self.info_cache.put(cache_key, ydl.sanitize_info(info, True))
+
+                    # Finish the extraction we started and download from it
+                    ydl.process_ie_result(info, download=True)
+
+            if ydl.deferred:
+                # The data is in: free the download slot, ffmpeg runs on the stage
+                job.set_state(POST_PROCESSING)
+                self.postprocessing.submit(functools.partial(self.post_process, job, ydl))
+                ydl = None
+                return
+            job.set_state(DONE)
+        except Exception as e:
+            traceback.print_exc()
+            job.set_state(FAILED, str(e))
+        finally:
+            if ydl is not None:
+                ydl.close()
+                if self.disk:
+                    self.disk.release(job.id)
+            if self.bandwidth:
+                self.bandwidth.release(job.id)
+
+    def post_process(self, job, ydl):
+        """Finish a job whose post-processing was deferred, runs on the stage."""
+        try:
+            filepaths = ydl.run_deferred()
+            job.filepath = filepaths[-1] or job.filepath
+            job.set_state(DONE)
+        except Exception as e:
+            traceback.print_exc()
+            job.set_state(FAILED, str(e))
+        finally:
+            ydl.close()
+            if self.disk:
+                self.disk.release(job.id)
+
+    def download_entries(self, ydl, job, playlist, entries):
+        """Download a playlist's entries one after another inside the job."""
+        downloaded = 0
+        for entry in entries:
+            if not entry or (is_reference_entry(entry) and not _entry_job_info(entry, job.url)):
+                continue  # Unavailable, or a link back to the playlist itself
+            # What yt-dlp's own playlist handling fills in from the page
+            ydl.process_ie_result(entry, download=True, extra_info={
+                'webpage_url': playlist.get('webpage_url') or job.url,
+                'extractor': playlist.get('extractor'),
+                'extractor_key': playlist.get('extractor_key'),
+            })
+            downloaded += 1
+        if not downloaded:
+            raise RuntimeError("Playlist is empty")
+
+    def download_cached(self, ydl, job, cache_key):
+        """Download from cached info like --load-info-json, True on success.
+
+        On failure (usually expired media URLs) the entry is dropped and
+        the caller extracts fresh, which is also what yt-dlp does.
+        """
+        import yt_dlp
+
+        info = self.info_cache.get(cache_key)
+        if not info:
+            return False
+        print(f"[{job.url}] Using cached info for {cache_key[0]} {cache_key[1]}")
+        job.title = job.title or info.get('title')
+        try:
+            ydl.process_ie_result(info, download=True)
+            return True
+        except yt_dlp.utils.DownloadError as e:
+            print(f"[{job.url}] Cached info failed to download ({e}), extracting again")
+            self.info_cache.invalidate(cache_key)
+            if self.disk:
+                self.disk.release(job.id)
+            return False
+
+
+class YtdlpProcessEngine:
+    """Run the yt-dlp executable as a child process and parse its output.
+
+    Used when the yt_dlp package is not importable (e.g. a build that only
+    ships yt-dlp.exe). Progress comes from --progress-template lines, one
+    per update thanks to --newline.
+    """
+
+    PROGRESS_PREFIX = "SYH-PROGRESS"
+    PROGRESS_TEMPLATE = (
+        "download:" + PROGRESS_PREFIX +
+        " %(progress.downloaded_bytes)s %(progress.total_bytes)s"
+        " %(progress.total_bytes_estimate)s %(progress.speed)s %(progress.eta)s"
+    )
+    DESTINATION_RE = re.compile(r'^\[download\] Destination: (.+)$')
+    # Lines naming the file a download ends up in, the last one seen wins
+    OUTPUT_FILE_RES = (
+        DESTINATION_RE,
+        re.compile(r'^\[download\] (.+) has already been downloaded$'),
+        re.compile(r'^\[Merger\] Merging formats into "(.+)"$'),
+        re.compile(r'^\[ExtractAudio\] Destination: (.+)$'),
+    )
+    POSTPROCESS_RE = re.compile(r'^\[(Merger|ExtractAudio|EmbedSubtitle|FFmpeg\w*|Fixup\w*|VideoConvertor|VideoRemuxer)\]')
+
+    def __init__(self, project_dir, downloads_dir, info_cache=None, bandwidth=None, disk=None):
+        self.project_dir = project_dir
+        self.downloads_dir = downloads_dir
+        self.info_cache = info_cache
+        self.bandwidth = bandwidth
+        self.disk = disk
+        self.cores = os.cpu_count() or 1
+        self._children = 0  # yt-dlp processes running right now
+        self._children_lock = threading.Lock()
+        self._processes = set()  # Every live child, downloads and extractions alike
+        self._stopped = False
+
+    def ytdlp_path(self):
+        """The yt-dlp executable downloads run with, None if there is none."""
+        return find_local_tool(self.project_dir, 'yt-dlp') or shutil.which('yt-dlp')
+
+    def ytdlp_command(self):
+        return [find_local_tool(self.project_dir, 'yt-dlp') or 'yt-dlp']
+
+    def make_command(self, job, info_file=None):
+        args = build_ytdlp_args(job.url, job.options, self.downloads_dir)
+        if info_file:
+            # Swap the URL for the info we already extracted
+            args = args[:-1] + ["--load-info-json", info_file]
+        limit = self.bandwidth.share_hint() if self.bandwidth else None
+        if limit:
+            # A child process can't be re-throttled later, it keeps its starting share
+            args = ["--limit-rate", str(int(limit))] + args
+        if job.options.get('use_ffmpeg', True):
+            # Same goes for its ffmpeg runs, they get the cores split between the running children
+            with self._children_lock:
+                threads = max(1, self.cores // max(1, self._children))
+            args = ["--postprocessor-args", f"ffmpeg:-threads {threads}"] + args
+        return (
+            self.ytdlp_command()
+            + ["--newline", "--progress-template", self.PROGRESS_TEMPLATE]
+            + args
+        )
+
+    def _run_args(self):
+        run_args = {}
+        if platform.system() == "Windows":
+            run_args["creationflags"] = subprocess.CREATE_NO_WINDOW
+        return run_args
+
+    def _spawn(self, command, **popen_args):
+        """Start a yt-dlp child that shutdown() knows about."""
+        with self._children_lock:
+            if self._stopped:
+                raise OSError("the helper is shutting down")
+            process = subprocess.Popen(
+                command,
+                cwd=self.project_dir,  # Run from project dir so yt-dlp and ffmpeg are found
+                stdin=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                **popen_args,
+                **self._run_args()
+            )
+            self._processes.add(process)
+        return process
+
+    def _reap(self, process):
+        with self._children_lock:
+            self._processes.discard(process)
+
+    def shutdown(self, timeout=2.0):
+        """Stop every running yt-dlp child and refuse to start new ones.
+
+        Left running they would outlive the helper, and the resumed job
+        next start would download into the same .part file next to them.
+        """
+        with self._children_lock:
+            self._stopped = True
+            processes = list(self._processes)
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def extract(self, job):
+        """Flat-extract the job URL with -j, yielding one info dict per line.
+
+        For a playlist every line is an entry, printed as soon as yt-dlp
+        gets to it (--lazy-playlist, otherwise it fetches every page first),
+        so huge playlists never sit in memory as one document. For a single
+        video the only line is the full video info.
+        """
+        args = build_ytdlp_args(job.url, job.options, self.downloads_dir)
+        # Warnings go to a file: a pipe nobody reads until the end can fill up and stall yt-dlp
+        stderr_file = tempfile.TemporaryFile('w+', encoding='utf-8', errors='replace')
+        try:
+            process = self._spawn(
+                self.ytdlp_command() + ["--flat-playlist", "--lazy-playlist", "-j"] + args,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file
+            )
+        except OSError:
+            stderr_file.close()
+            raise
+        try:
+            for line in process.stdout:
+                if line.strip():
+                    yield json.loads(line)
+            returncode = process.wait()
+            stderr_file.seek(0)
+            stderr = stderr_file.read()
+            if returncode != 0:
+                errors = [line for line in stderr.splitlines() if line.startswith("ERROR:")]
+                raise RuntimeError(errors[-1][len("ERROR:"):].strip() if errors else f"yt-dlp exited with code {process.returncode}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            self._reap(process)
+            process.stdout.close()
+            stderr_file.close()
+
+    @staticmethod
+    def _number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def handle_line(self, job, line):
+        """Update the job from one line of yt-dlp output."""
+        if line.startswith(self.PROGRESS_PREFIX):
+            fields = line.split()[1:]
+            if len(fields) == 5:
+                downloaded, total, estimate, speed, eta = (self._number(f) for f in fields)
+                job.update_progress(downloaded, total or estimate, speed, eta)
+                if self.bandwidth and downloaded is not None:
+                    # Sleeping here stops us draining the pipe, which stalls the child too
+                    self.bandwidth.throttle(job.id, downloaded)
+            return
+
+        print(f"[{job.url}] {line}")
+        for output_re in self.OUTPUT_FILE_RES:
+            output_match = output_re.match(line)
+            if output_match:
+                job.filepath = output_match.group(1)
+        match = self.DESTINATION_RE.match(line)
+        if match and not job.title:
+            name = os.path.splitext(os.path.basename(match.group(1)))[0]
+            job.title = re.sub(r'\.f\d+$', '', name)  # Drop the per-format suffix
+        elif self.POSTPROCESS_RE.match(line):
+            job.set_state(POST_PROCESSING)
+            kind = ffmpeg_output_kind(line)
+            if kind:
+                job.note_processing(kind)
+        elif line.startswith("ERROR:"):
+            job.error = line[len("ERROR:"):].strip()
+        if line.startswith(("WARNING:", "ERROR:")) and is_throttle_error(line):
+            job.note_throttled()
+
+    def run(self, job):
+        """Download a single job, moving it through the job states.
+
+        Playlist entries are returned instead of downloaded, see YtdlpEngine.run().
+        """
+        try:
+            return self._run(job)
+        finally:
+            if self.disk:
+                self.disk.release(job.id)
+            if self.bandwidth:
+                self.bandwidth.release(job.id)
+
+    def _admit(self, job, *infos):
+        """Hold the download until it fits on disk, the infos come with their formats selected."""
+        if self.disk is None:
+            return
+        options = job.options
+        sizes = []
+        for info in infos:
+            rewritten = options.get('use_ffmpeg', True) and bool(
+                info.get('requested_formats') or options.get('audio_only') or options.get('embed_subs')
+            )
+            sizes.append(estimate_disk_usage(info, rewritten))
+        # One unknown size makes the total unknown
+        self.disk.reserve(job, sum(sizes) if all(sizes) else 0, [self.downloads_dir])
+
+    def _run(self, job):
+        job.set_state(EXTRACTING)
+        cache_key = self.info_cache.key_for_url(job.url) if self.info_cache else None
+        info = self.info_cache.get(cache_key) if cache_key else None
+        if info:
+            print(f"[{job.url}] Using cached info")
+            job.title = job.title or info.get('title')
+            job.archive_id = job.archive_id or archive_id(info.get('extractor_key'), info.get('id'))
+            self._admit(job, info)
+            if self._download_from_info(job, info):
+                return
+            # Probably expired media URLs, extract again
+            self.info_cache.invalidate(cache_key)
+            if self.disk:
+                self.disk.release(job.id)
+            job.error = None
+            job.set_state(EXTRACTING)
+
+        stream = self.extract(job)
+        try:
+            info = next(stream, None)
+            if info is None:
+                raise RuntimeError("Nothing to download")
+            if info.get('playlist_index') is not None:
+                job.title = job.title or info.get('playlist_title') or info.get('playlist')
+                entries, inline = inline_entries(itertools.chain([info], stream))
+                if not inline:
+                    return stream_playlist_entries(entries, job.url, on_close=stream.close)
+                # Extracted videos on one page: yt-dlp downloads the whole page in this job
+                entries = list(entries)
+                self._admit(job, *entries)
+                self._download(job, None)
+                return
+            # A single video, let the process finish before using its info
+            for _ in stream:
+                pass
+        except Exception as e:
+            stream.close()
+            job.set_state(FAILED, f"Could not extract info: {e}")
+            return
+        job.title = job.title or info.get('title')
+        job.archive_id = job.archive_id or archive_id(info.get('extractor_key'), info.get('id'))
+        if cache_key:
+            self.info_cache.put(cache_key, info)
+        self._admit(job, info)
+        self._download_from_info(job, info, final=True)
+
+    def _download_from_info(self, job, info, final=False):
+        """Run the download through --load-info-json.
+
+        Returns False if the download failed and, since it was not final,
+        the job was left running for the caller to retry.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.info.json', delete=False, encoding='utf-8') as f:
+            json.dump(info, f)
+            info_file = f.name
+        try:
+            return self._download(job, info_file, final)
+        finally:
+            os.remove(info_file)
+
+    def _download(self, job, info_file, final=True):
+        with self._children_lock:
+            self._children += 1
+        try:
+            return self._run_child(job, info_file, final)
+        finally:
+            with self._children_lock:
+                self._children -= 1
+
+    def _run_child(self, job, info_file, final):
+        try:
+            process = self._spawn(
+                self.make_command(job, info_file),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT
+            )
+        except OSError as e:
+            job.set_state(FAILED, f"Could not start yt-dlp: {e}")
+            return True  # A retry would fail the same way
+
+        try:
+            for line in process.stdout:
+                line = line.rstrip()
+                if line:
+                    self.handle_line(job, line)
+            retcode = process.wait()
+        finally:
+            self._reap(process)
+            process.stdout.close()
+        if retcode == 0:
+            job.set_state(DONE)
+        elif final:
+            job.set_state(FAILED, job.error or f"yt-dlp exited with code {retcode}")
+        else:
+            return False
+        return True
+
+
+def local_ytdlp_is_newer(project_dir, probe=True):
+    """Whether the yt-dlp executable next to the helper is newer than the bundled package.
+
+    That's where the updater puts new releases. Its version is probed once
+    per changed file and cached with the update check. Without probe an
+    executable whose version isn't cached yet counts as older.
+    """
+    binary = find_local_tool(project_dir, 'yt-dlp')
+    if not binary:
+        return False
+    binary_version = UpdateChecker(update_cache_path(project_dir), binary).local_version(probe)
+    return version_key(binary_version) > version_key(ytdlp_module_version())
+
+
+def create_engine(project_dir, downloads_dir, bandwidth=None, disk=None, probe=True):
+    """Pick the in-process engine when possible, the yt-dlp executable otherwise.
+
+    An updated yt-dlp executable next to the helper wins over an older
+    bundled package, so updates actually get used. Finding out can mean
+    running the executable (seconds for onefile builds); probe=False never
+    does, and decides on the cached version alone.
+    """
+    info_cache = InfoCache(os.path.join(project_dir, 'cache', 'info'))
+    if ytdlp_module_available() and not local_ytdlp_is_newer(project_dir, probe):
+        return YtdlpEngine(project_dir, downloads_dir, info_cache, bandwidth, PostProcessStage(), disk)
+    return YtdlpProcessEngine(project_dir, downloads_dir, info_cache, bandwidth, disk)
+
+
+class DownloadQueue:
+    """FIFO download queue served by a bounded pool of worker threads.
+
+    Jobs are started in submission order and never more than max_workers
+    at once, nor more than per_host_limit against one site. A site that
+    rate limits us (HTTP 429) gets no new jobs for a while, with the pause
+    doubling while it keeps at it, and only one at a time until a download
+    from it succeeds again. Jobs it failed are queued again instead of
+    failing. Jobs for other sites keep running, whatever waits in front
+    of them. The listener is called from worker threads on
+    every job state or progress change, so GUI code has to marshal it to
+    the main thread itself. Cheaper still is to poll: `revision` is bumped
+    on every change, so a timer can skip refreshes when nothing happened.
+    """
+
+    # How many entries of one playlist may wait in the queue before the
+    # enumerator stops pulling more from the extractor
+    PLAYLIST_LOOKAHEAD = 32
+    # Backoff for a rate limiting site, doubled per repeat up to the max
+    THROTTLE_BACKOFF = 30.0
+    MAX_THROTTLE_BACKOFF = 600.0
+    # Times a rate limited job goes back in the queue before it fails for real
+    THROTTLE_RETRIES = 3
+
+    def __init__(self, engine, max_workers=3, listener=None, archive=None, journal=None, per_host_limit=2):
+        self.engine = engine
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = per_host_limit  # 0 for no limit
+        self.listener = listener
+        # Submitted URLs are journaled so they can be resumed after a restart
+        self.journal = journal
+        # Jobs already in the archive are skipped before they reach the engine
+        self.archive = archive
+        self.skip_archived = True
+        self.jobs = []  # Every job submitted this session, in order
+        self.revision = 0
+        self._pending = deque()
+        self._workers = set()
+        self._busy = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._inflight = {}  # dedup_key() -> queued or running job
+        self._host_running = {}  # host -> running jobs
+        self._host_backoff = {}  # host -> (monotonic time it may start jobs again, last delay)
+
+    def submit(self, url, options, journal_id=None, key=None):
+        """Queue a URL for download and return its job.
+
+        journal_id is given when resuming a job that is already journaled.
+        key is the URL's dedup_key() when later duplicates should coalesce
+        with this job.
+        """
+        job = DownloadJob(url, options)
+        job._listener = self._notify
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Download queue has been shut down")
+            if key is not None:
+                self._track(job, key)
+            if self.journal is not None:
+                job.journal_id = journal_id or uuid.uuid4().hex
+                if not journal_id:
+                    self.journal.job_added(job)
+            self.jobs.append(job)
+            self._pending.append(job)
+            self._spawn_workers()
+            self._cond.notify()
+        self._notify(job)
+        return job
+
+    def submit_unique(self, url, options):
+        """Queue a URL unless the same video is already queued or running.
+
+        Returns (job, True) for a new job, or (the job already handling that
+        video, False). Canonicalizing can load yt-dlp's extractors, so call
+        this off the GUI thread.
+        """
+        key = dedup_key(url)
+        with self._cond:
+            existing = self._inflight.get(key)
+            if existing is not None and not existing.finished:
+                return existing, False
+            return self.submit(url, options, key=key), True
+
+    def set_max_workers(self, count):
+        """Change the number of concurrent downloads, applied as jobs finish."""
+        with self._cond:
+            self.max_workers = max(1, int(count))
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def set_per_host_limit(self, count):
+        """Change how many downloads may run against one site, 0 for no limit."""
+        with self._cond:
+            self.per_host_limit = max(0, int(count))
+            self._cond.notify_all()
+
+    def active_jobs(self):
+        """Jobs that are queued or running."""
+        with self._cond:
+            return [job for job in self.jobs if not job.finished]
+
+    def resume_journaled(self):
+        """Submit the jobs a previous session left unfinished, returns them."""
+        if self.journal is None:
+            return []
+        return [
+            self.submit(
+                record['url'], record.get('options') or {}, journal_id=record['id'],
+                # Records from before keys were journaled fall back to the plain URL
+                key=tuple(record['key']) if record.get('key') else ('url', normalize_url(record['url']))
+            )
+            for record in self.journal.unfinished()
+        ]
+
+    def shutdown(self):
+        """Stop handing out queued jobs and stop the engine's child processes.
+
+        Whatever did not finish stays in the journal and resumes next start.
+        """
+        with self._cond:
+            self._closed = True  # Before the children die, so their failures aren't journaled
+            self._cond.notify_all()
+        if hasattr(self.engine, 'shutdown'):
+            self.engine.shutdown()
+        if self.journal is not None:
+            self.journal.close()
+
+    def _fan_out(self, parent, entries):
+        """Turn a playlist job into a group, queueing its entries as they stream in.
+
+        Enumeration runs on its own thread so it never holds a download
+        slot, and it pauses while PLAYLIST_LOOKAHEAD entries are waiting.
+        """
+        parent.enumerating = True
+        parent.set_state(DOWNLOADING)
+        threading.Thread(target=self._enumerate, args=(parent, entries), daemon=True).start()
+
+    def _enumerate(self, parent, entries):
+        try:
+            for entry in entries:
+                child = DownloadJob(entry['url'], parent.options)
+                # Off the GUI thread here, so canonicalizing a URL without an id is fine
+                key = entry.get('archive_id') or dedup_key(entry['url'])
+                child.title = entry.get('title')
+                child.archive_id = entry.get('archive_id')
+                child.parent = parent
+                child._listener = self._notify
+                if self._skip_if_archived(child):
+                    # Known entries never take a queue slot
+                    with self._cond:
+                        parent.children.append(child)
+                        self.jobs.append(child)
+                    self._notify(child)
+                    continue
+                with self._cond:
+                    while (not self._closed
+                           and sum(1 for job in self._pending if job.parent is parent) >= self.PLAYLIST_LOOKAHEAD):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    parent.children.append(child)
+                    self.jobs.append(child)
+                    self._insert_child(parent, child)
+                    # A pasted link to this entry coalesces with it
+                    self._track(child, key)
+                    self._spawn_workers()
+                    self._cond.notify_all()
+                self._notify(child)
+        except Exception as e:
+            traceback.print_exc()
+            parent.error = f"Playlist listing stopped early: {e}"
+        finally:
+            if hasattr(entries, 'close'):
+                entries.close()
+            with self._cond:
+                parent.enumerating = False
+                self._check_group_finished(parent)
+
+    def _track(self, job, key):
+        # Caller holds the lock. Later submit_unique() calls for key get this job.
+        existing = self._inflight.get(key)
+        if existing is None or existing.finished:
+            job.dedup_key = key
+            self._inflight[key] = job
+
+    def _skip_if_archived(self, job):
+        """Mark the job done without downloading if the archive has it."""
+        if self.archive is None or not self.skip_archived:
+            return False
+        if not job.archive_id:
+            job.archive_id = self.archive.key_for_url(job.url)
+        if job.archive_id in self.archive:
+            job.skipped = True
+            job.state = DONE
+            return True
+        return False
+
+    def _insert_child(self, parent, child):
+        # Caller holds the lock. Entries go after their queued siblings but
+        # ahead of anything submitted after the playlist.
+        index = 0
+        for i, job in enumerate(self._pending):
+            if job.parent is parent:
+                index = i + 1
+        self._pending.insert(index, child)
+
+    def _check_group_finished(self, parent):
+        # Caller holds the lock
+        if parent.finished or parent.enumerating:
+            return
+        if parent.children_done + parent.children_failed < len(parent.children):
+            return
+        if not parent.children:
+            parent.set_state(FAILED, parent.error or "Playlist is empty")
+        elif parent.children_failed:
+            parent.set_state(FAILED, f"{parent.children_failed} of {len(parent.children)} entries failed")
+        else:
+            parent.set_state(DONE)
+
+    def _notify(self, job):
+        self.revision += 1
+        if job.throttled or (job.state == FAILED and not job.is_group and is_throttle_error(job.error)):
+            job.throttled = False
+            self._back_off(job.host)
+            if job.state == FAILED and self._requeue_throttled(job):
+                self._call_listener(job)
+                return
+        if job.finished and job.dedup_key is not None:
+            with self._cond:
+                if self._inflight.get(job.dedup_key) is job:
+                    del self._inflight[job.dedup_key]
+        if job.state == DONE and self.archive is not None and not job.skipped and not job.is_group:
+            size = None
+            if job.filepath and os.path.exists(job.filepath):
+                size = os.path.getsize(job.filepath)
+            self.archive.add(job.archive_id, job.filepath, size)
+        if job.finished and job.journal_id and self.journal is not None and not self._closed:
+            # Jobs cut short by shutdown are left unfinished in the journal
+            self.journal.job_finished(job)
+        parent = job.parent
+        if parent and job.finished and not job._counted:
+            with self._cond:
+                job._counted = True
+                if job.state == DONE:
+                    parent.children_done += 1
+                else:
+                    parent.children_failed += 1
+                self._check_group_finished(parent)
+        self._call_listener(job)
+
+    def _call_listener(self, job):
+        if self.listener:
+            try:
+                self.listener(job)
+            except Exception as e:
+                print(f"Queue listener failed: {e}")
+
+    def _back_off(self, host):
+        """Hold new jobs for a site that rate limited us."""
+        with self._cond:
+            now = time.monotonic()
+            until, delay = self._host_backoff.get(host, (0.0, 0.0))
+            if until > now:
+                return  # Already backing off, yt-dlp retrying on its own isn't news
+            delay = min(self.MAX_THROTTLE_BACKOFF, delay * 2 if delay else self.THROTTLE_BACKOFF)
+            self._host_backoff[host] = (now + delay, delay)
+            print(f"{host} is rate limiting, no new downloads from it for {delay:.0f}s")
+
+    def _requeue_throttled(self, job):
+        """Put a job that failed on a rate limit back in the queue, if it has retries left."""
+        with self._cond:
+            if self._closed or job.throttle_retries >= self.THROTTLE_RETRIES:
+                return False
+            job.throttle_retries += 1
+            job.state = QUEUED
+            job.error = None
+            job.downloaded_bytes = 0
+            job.speed = job.eta = None
+            # It was next in line before, and the backoff holds it anyway
+            self._pending.appendleft(job)
+            self._spawn_workers()
+            self._cond.notify_all()
+        return True
+
+    def _host_limit(self, host, now):
+        # Caller holds the lock. Running jobs allowed for a site right now.
+        until, delay = self._host_backoff.get(host, (0.0, 0.0))
+        if until > now:
+            return 0
+        if delay:
+            return 1  # Recently rate limited, one at a time until it recovers
+        return self.per_host_limit or self.max_workers
+
+    def _next_job(self):
+        # Caller holds the lock. First pending job whose site has room.
+        now = time.monotonic()
+        for i, job in enumerate(self._pending):
+            if self._host_running.get(job.host, 0) < self._host_limit(job.host, now):
+                del self._pending[i]
+                return job
+        return None
+
+    def _next_backoff_end(self):
+        # Caller holds the lock. Seconds until a backing off site may run jobs again.
+        now = time.monotonic()
+        ends = [until - now for until, _ in self._host_backoff.values() if until > now]
+        return min(ends) if ends else None
+
+    def _spawn_workers(self):
+        # Caller holds the lock
+        while (len(self._workers) < self.max_workers
+               and len(self._workers) - self._busy < len(self._pending)):
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.add(worker)
+            worker.start()
+
+    def _worker_loop(self):
+        me = threading.current_thread()
+        while True:
+            with self._cond:
+                job = None
+                while not self._closed and len(self._workers) <= self.max_workers:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    # Woken by new jobs and finished ones, or when a backoff runs out
+                    self._cond.wait(self._next_backoff_end())
+                if job is None:
+                    self._workers.discard(me)
+                    return
+                self._busy += 1
+                self._host_running[job.host] = self._host_running.get(job.host, 0) + 1
+                self._cond.notify_all()  # Wakes playlist enumerators waiting for room
+            try:
+                if self._skip_if_archived(job):
+                    self._notify(job)
+                    continue
+                entries = self.engine.run(job)
+                if entries is not None:
+                    self._fan_out(job, entries)
+            except Exception as e:
+                traceback.print_exc()
+                job.set_state(FAILED, str(e))
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._host_running[job.host] -= 1
+                    downloaded = job.state in (DONE, POST_PROCESSING) and not job.skipped
+                    if downloaded and self._host_backoff.get(job.host, (0.0,))[0] <= time.monotonic():
+                        # The site is fine again, back to the normal limit
+                        self._host_backoff.pop(job.host, None)
+                    self._cond.notify_all()